@@ -2,5 +2,7 @@ from .health import health_bp
 from .check import checks_bp
 from .history import history_bp
 from .monitored import monitored_bp
+from .stats import stats_bp
+from .metrics import metrics_bp, init_request_metrics
 
-__all__ = ['health_bp', 'checks_bp', 'history_bp', 'monitored_bp']
+__all__ = ['health_bp', 'checks_bp', 'history_bp', 'monitored_bp', 'stats_bp', 'metrics_bp', 'init_request_metrics']
@@ -1,11 +1,21 @@
-from flask import Blueprint, request, jsonify
-from app.services import check_health
+from flask import Blueprint, Response, request, jsonify, current_app, url_for, stream_with_context
+from app.services import check_health, write_results, health_check_row
 from app.utils import validate_url, validate_timeout
-from app.db import get_db
-from app.models import HealthCheck
+from app.db import get_db, request_db
+from app.models import CheckJob
+from datetime import datetime, timezone, timedelta
+import json
+import math
+import time
 
 checks_bp = Blueprint("checks", __name__, url_prefix='/api/v1')
 
+CHECK_JOB_MAX_WAIT = 30 # longest long-poll, in seconds
+CHECK_JOB_POLL_INTERVAL = 0.25 # seconds between reads of a job running in another process
+CHECK_JOB_LOST_AFTER = 60 # seconds past its timeout, from when it started, before an unfinished job is reported lost
+CHECK_JOB_LOST_QUEUED = 1800 # seconds a job may wait for a worker before it is reported lost
+CHECK_BATCH_MAX_ITEMS = 1000 # urls accepted by one batch request
+
 @checks_bp.route('/check', methods=['POST'])
 def get_health():
     """
@@ -13,6 +23,12 @@ def get_health():
     Request json data
         "url" - The URL to check
         "timeout" - in seconds
+        "max_age" - in seconds, the oldest cached result that is acceptable,
+                    0 forces a new check (also accepted as a query param)
+    When the result sink is enabled the check is written in the background
+    and "check_id" is null.
+    When the check cache is enabled, responses carry "cached" and "age_s", and a
+    cached result is returned without checking the url or writing a new row.
     """
     # Validate request is in application/json format
     if not request.is_json:
@@ -36,26 +52,234 @@ def get_health():
             "error": error
         }), 400
     
-    result = check_health(url, timeout)
+    max_age = data.get("max_age", request.args.get("max_age", type=float))
+    if max_age is not None and (
+        isinstance(max_age, bool) or not isinstance(max_age, (int, float)) or not math.isfinite(max_age) or max_age < 0
+    ):
+        return jsonify({
+            "error": "max_age must be a finite, non-negative number of seconds"
+        }), 400
+
+    cache = current_app.extensions.get('check_cache')
+    if cache is not None:
+        cached = cache.get((url, timeout), max_age)
+        if cached is not None:
+            result, age = cached
+            result['cached'] = True
+            result['age_s'] = age
+            return jsonify(result), 200
+
+    result = check_health(url, timeout, max_age=max_age)
+
+    row = health_check_row(url, timeout, result)
+    sink = current_app.extensions.get('result_sink')
+    if sink is not None:
+        sink.add(row)
+        result['check_id'] = None
+    else:
+        db_session = request_db()
+        result['check_id'] = write_results(db_session, [row])[0]
+
+    if cache is not None:
+        cache.put((url, timeout), result)
+        result['cached'] = False
+        result['age_s'] = 0.0
+    return jsonify(result), 200
+
+@checks_bp.route('/check/async', methods=['POST'])
+def start_check():
+    """
+    Flask endpoint to check the url health in the background.
+    Request json data
+        "url" - The URL to check
+        "timeout" - in seconds
+    Responds 202 with the job, see get_check_job, and its location.
+    """
+    runner = current_app.extensions.get('check_jobs')
+    if runner is None:
+        return jsonify({
+            "error": "Asynchronous checks need a database"
+        }), 503
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({
+            "error": "JSON request is required"
+        }), 400
+
+    url = str(data.get("url", "")).strip()
+    is_valid, error = validate_url(url)
+    if not is_valid:
+        return jsonify({
+            "error": error
+        }), 400
+
+    timeout = data.get("timeout", 10)
+    is_valid, error = validate_timeout(timeout)
+    if not is_valid:
+        return jsonify({
+            "error": error
+        }), 400
+
+    job = runner.submit(request_db(), url, timeout)
+    if job is None:
+        return jsonify({
+            "error": "Too many checks in progress, try again later"
+        }), 503
+    location = url_for("checks.get_check_job", job_id=job.id)
+    return jsonify({**job.to_dict(), "status_url": location}), 202, {"Location": location}
 
+@checks_bp.route('/check/jobs/<int:job_id>', methods=['GET'])
+def get_check_job(job_id:int):
+    """
+    Get a job started by /check/async.
+    Query params
+        "wait": seconds to wait for a pending job to finish (optional, defaults to 0, max 30)
+    The job's status is pending, done, with result and check_id set, or failed, with error
+    set. A job that is still pending long after it started, by its timeout, or that was never
+    picked up by a worker is reported as failed: the process running it stopped before it
+    finished. started_at is null while the job waits for a worker.
+    """
+    wait = request.args.get("wait", 0, type=float)
+    if not math.isfinite(wait) or wait < 0:
+        return jsonify({
+            "error": "wait must be a finite, non-negative number of seconds"
+        }), 400
+    deadline = time.monotonic() + min(wait, CHECK_JOB_MAX_WAIT)
+    runner = current_app.extensions.get('check_jobs')
+
+    db_session = request_db()
+    job = db_session.get(CheckJob, job_id)
+    if job is None:
+        return jsonify({
+            "error": "Check job not found"
+        }), 404
+    while job.status == "pending":
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        # end the transaction, so the connection goes back to the pool while waiting
+        db_session.rollback()
+        if runner is None or not runner.wait(job_id, remaining):
+            time.sleep(min(CHECK_JOB_POLL_INTERVAL, remaining))
+        db_session.refresh(job)
+
+    result = job.to_dict()
+    if job.started_at is not None:
+        lost_at = job.started_at + timedelta(seconds=job.timeout_s + CHECK_JOB_LOST_AFTER)
+    else:
+        lost_at = job.created_at + timedelta(seconds=CHECK_JOB_LOST_QUEUED)
+    # a job this process still runs or has queued is never lost
+    in_progress_here = runner is not None and runner.is_pending(job_id)
+    if job.status == "pending" and not in_progress_here and datetime.now(timezone.utc) > lost_at:
+        result["status"] = "failed"
+        result["error"] = "Check job was lost"
+    return jsonify(result), 200
+
+def validate_batch_item(item)->tuple[tuple[str, float]|None, str|None]:
+    """Validate one item of a batch check, returns its (url, timeout)."""
+    if not isinstance(item, dict):
+        return None, "JSON object expected"
+    url = item.get("url", "")
+    if not isinstance(url, str):
+        return None, "Invalid URL format"
+    url = url.strip()
+    timeout = item.get("timeout", 10)
+    for is_valid, error in (validate_url(url), validate_timeout(timeout)):
+        if not is_valid:
+            return None, error
+    return (url, timeout), None
+
+@checks_bp.route('/check/batch', methods=['POST'])
+def check_batch():
+    """
+    Flask endpoint to check the health of many urls at once.
+    Request body: a JSON array of {"url", "timeout"} objects, at most CHECK_BATCH_MAX_ITEMS.
+    Query params
+        "concurrency" - probes run at once (optional, defaults to and capped at CHECK_BATCH_CONCURRENCY)
+    Responds with NDJSON, streamed as the probes finish: one line per item with its
+    "index" in the request and the result of /check, or "status": "invalid" and the
+    error. The results are written in one batch once every probe finished, and the
+    last line carries the "summary" and the "check_ids", in request order.
+    """
+    items = request.get_json(silent=True)
+    if not isinstance(items, list):
+        return jsonify({
+            "error": "JSON array expected"
+        }), 400
+    if len(items) > CHECK_BATCH_MAX_ITEMS:
+        return jsonify({
+            "error": f"At most {CHECK_BATCH_MAX_ITEMS} items per request"
+        }), 400
+    concurrency = request.args.get("concurrency", type=int)
+    if concurrency is not None and concurrency < 1:
+        return jsonify({
+            "error": "concurrency must be a positive integer"
+        }), 400
+
+    checker = current_app.extensions['check_batch']
+    sink = current_app.extensions.get('result_sink')
+
+    def generate():
+        start = time.perf_counter()
+        counts = {}
+        targets = []
+        target_indexes = []
+        for index, item in enumerate(items):
+            target, error = validate_batch_item(item)
+            if error:
+                counts["invalid"] = counts.get("invalid", 0) + 1
+                url = item.get("url") if isinstance(item, dict) else None
+                yield json.dumps({"index": index, "url": url, "status": "invalid", "error": error}) + "\n"
+                continue
+            targets.append(target)
+            target_indexes.append(index)
+
+        rows = [None] * len(targets)
+        results = checker.check(targets, concurrency)
+        try:
+            for position, result in results:
+                url, timeout = targets[position]
+                rows[position] = health_check_row(url, timeout, result)
+                status = "error" if result["error"] else result["status"]
+                counts[status] = counts.get(status, 0) + 1
+                yield json.dumps({"index": target_indexes[position], **result}) + "\n"
+        finally:
+            # runs when the client goes away too: the probes not started yet are
+            # cancelled and the ones that finished are kept
+            results.close()
+            check_ids, write_error = write_batch([row for row in rows if row is not None], sink)
+
+        # only reached once every probe finished, so the ids line up with the targets
+        by_index = [None] * len(items)
+        for index, check_id in zip(target_indexes, check_ids or []):
+            by_index[index] = check_id
+        yield json.dumps({
+            "summary": {"count": len(items), **counts, "elapsed_ms": (time.perf_counter() - start) * 1000},
+            "check_ids": by_index,
+            **({"error": write_error} if write_error else {}),
+        }) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+def write_batch(rows:list[dict], sink)->tuple[list[int]|None, str|None]:
+    """
+    Persist the results of a batch with a single write_results call, or hand them to
+    the result sink when it is enabled.
+    Response
+        tuple - the check ids in the order of rows (None with the sink), and the error of a failed write
+    """
+    if not rows:
+        return [], None
+    if sink is not None:
+        for row in rows:
+            sink.add(row)
+        return None, None
     db_session = get_db()
     try:
-        hc = HealthCheck(
-            url=url,
-            timeout_s=timeout,
-            status_code=result['status_code'],
-            is_healthy=True if result['status'] == "healthy" else False,
-            response_time_ms=result['response_time_ms'],
-            error=result['error'],
-        )
-        db_session.add(hc)
-        db_session.commit()
-        db_session.refresh(hc)
-        result['check_id'] = hc.id
+        return write_results(db_session, rows), None
+    except Exception as e:
+        db_session.rollback()
+        return None, f"Database error: {str(e)}"
     finally:
         db_session.close()
-    
-    return jsonify(result), 200
-    
-        
-    
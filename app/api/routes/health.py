@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify, current_app
 from datetime import datetime, timezone
-from app.db import get_db
+from app.db import request_db, pool_stats
+from app.services.dns_cache import dns_cache
 from sqlalchemy import text
 
 health_bp = Blueprint("health", __name__)
@@ -9,19 +10,19 @@ health_bp = Blueprint("health", __name__)
 def app_health():
     """Check the health of the monitoring service."""
     db_status = "connected"
-    db_session = get_db()
+    db_session = request_db()
     try:
         db_session.execute(text("SELECT 1"))
 
     except Exception as e:
         db_status = "failed"
-    finally:
-        db_session.close()
         
     return jsonify({
         "service": "thatworks-monitor",
         "version": current_app.config['SERVICE_VERSION'],
         "status": "healthy",
         "db_status": db_status,
+        "db_pool": pool_stats(),
+        "dns_cache": dns_cache.stats(),
         "timestamp": datetime.now(timezone.utc).isoformat(),
     })
@@ -1,47 +1,183 @@
-from flask import Blueprint, request, jsonify
-from app.db import get_db
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from app.db import get_db, request_db
 from app.models import HealthCheck
 from datetime import datetime, timezone, timedelta
-from sqlalchemy import desc
+from app.services.checker import TIMING_PHASES
+from app.utils import validate_limit, validate_hours
+from sqlalchemy import desc, tuple_, func
+import base64
+import csv
+import io
+import json
 
 history_bp = Blueprint("history", __name__, url_prefix="/api/v1")
 
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+EXPORT_CHUNK_SIZE = 1000 # rows fetched from the server side cursor, and written, at a time
+
+def encode_cursor(check:HealthCheck)->str:
+    token = json.dumps([check.created_at.isoformat(), check.id])
+    return base64.urlsafe_b64encode(token.encode()).decode()
+
+def decode_cursor(cursor:str)->tuple[datetime, int]:
+    created_at, check_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return datetime.fromisoformat(created_at), int(check_id)
+
 @history_bp.route("/history", methods=['GET'])
 def get_check_history():
     """
-    Return the health check history.
+    Return the health check history, newest first.
     Query params
         - url: The URL to health check
         - hours: Get checks from the last N hours (defaults to 24)
         - limit: Maximum number of results (default 100, max 1000)
+        - cursor: next_cursor from the previous page, to fetch the page after it
+        - summary: true to add the average of every timing phase over all the matching checks
     """
+    cursor = request.args.get("cursor", "")
+    if cursor:
+        try:
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+        except (ValueError, TypeError):
+            return jsonify({
+                "error": "Invalid cursor"
+            }), 400
+
+    hours = request.args.get("hours", "24")
+    limit = request.args.get("limit", "100")
+    for is_valid, error in (validate_hours(hours), validate_limit(limit)):
+        if not is_valid:
+            return jsonify({
+                "error": error
+            }), 400
+    hours = int(hours)
+    limit = min(int(limit), 1000)
     
-    db_session = get_db()
-    try:
-        query = db_session.query(HealthCheck)
-        
-        url = request.args.get("url", "")
-        if url:
-            query = query.filter(HealthCheck.url == url)
-        
-        hours = request.args.get("hours", 24, type=int)
-        since = datetime.now(timezone.utc) - timedelta(hours=hours)
-        if since:
-            query = query.filter(HealthCheck.created_at >= since)
-
-        limit = min(request.args.get("limit", 100, type=int), 1000)
-        
-        checks = query.order_by(desc(HealthCheck.created_at)).limit(limit).all()
+    db_session = request_db()
+    query = db_session.query(HealthCheck)
+    
+    url = request.args.get("url", "")
+    if url:
+        query = query.filter(HealthCheck.url == url)
+    
+    since = datetime.now(timezone.utc) - timedelta(hours=hours)
+    if since:
+        query = query.filter(HealthCheck.created_at >= since)
+
+    summary = None
+    if request.args.get("summary", "false").lower() == "true":
+        # over the url and hours filters only, so it is the same on every page
+        averages = query.with_entities(
+            *(func.avg(getattr(HealthCheck, phase)) for phase in TIMING_PHASES)
+        ).one()
+        summary = {f"avg_{phase}": average for phase, average in zip(TIMING_PHASES, averages)}
+
+    # keyset pagination: every page is an index range scan that starts where the last one ended
+    if cursor:
+        query = query.filter(
+            tuple_(HealthCheck.created_at, HealthCheck.id) < tuple_(cursor_created_at, cursor_id)
+        )
+
+    checks = (
+        query.order_by(desc(HealthCheck.created_at), desc(HealthCheck.id))
+        .limit(limit + 1)
+        .all()
+    )
+    next_cursor = None
+    if len(checks) > limit:
+        checks = checks[:limit]
+        next_cursor = encode_cursor(checks[-1])
+
+    return jsonify({
+        "count": len(checks),
+        "filters": {
+            "url": url,
+            "hours": hours,
+            "limit": limit,
+        },
+        "checks": [check.to_dict() for check in checks],
+        "next_cursor": next_cursor,
+        **({"summary": summary} if summary is not None else {}),
+    })
+
+def parse_timestamp(value:str)->datetime:
+    ts = datetime.fromisoformat(value)
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts
 
+@history_bp.route("/history/export", methods=['GET'])
+def export_check_history():
+    """
+    Stream the health check history, oldest first, without a row limit.
+    Query params
+        - url: The URL to health check
+        - hours: Export checks from the last N hours (defaults to 24)
+        - since, until: ISO 8601 timestamps, used instead of hours when given
+        - format: ndjson or csv (defaults to ndjson)
+    """
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({
+            "error": f"format must be one of {', '.join(EXPORT_FORMATS)}"
+        }), 400
+
+    url = request.args.get("url", "")
+    hours = request.args.get("hours", "24")
+    is_valid, error = validate_hours(hours)
+    if not is_valid and not request.args.get("since"):
         return jsonify({
-            "count": len(checks),
-            "filters": {
-                "url": url,
-                "hours": hours,
-                "limit": limit,
-            },
-            "checks": [check.to_dict() for check in checks]
-        })
-
-    finally:
-        db_session.close()
+            "error": error
+        }), 400
+    try:
+        if request.args.get("since"):
+            since = parse_timestamp(request.args["since"])
+        else:
+            since = datetime.now(timezone.utc) - timedelta(hours=int(hours))
+        until = parse_timestamp(request.args["until"]) if request.args.get("until") else None
+    except ValueError:
+        return jsonify({
+            "error": "since and until must be ISO 8601 timestamps"
+        }), 400
+
+    def generate():
+        db_session = get_db()
+        try:
+            query = db_session.query(HealthCheck).filter(HealthCheck.created_at >= since)
+            if url:
+                query = query.filter(HealthCheck.url == url)
+            if until:
+                query = query.filter(HealthCheck.created_at < until)
+            # yield_per streams from a server side cursor instead of loading every row
+            query = query.order_by(HealthCheck.created_at, HealthCheck.id).yield_per(EXPORT_CHUNK_SIZE)
+
+            buffer = io.StringIO()
+            writer = None
+            rows = 0
+            for check in query:
+                record = check.to_dict()
+                if export_format == "csv":
+                    if writer is None:
+                        writer = csv.DictWriter(buffer, fieldnames=list(record))
+                        writer.writeheader()
+                    writer.writerow(record)
+                else:
+                    buffer.write(json.dumps(record))
+                    buffer.write("\n")
+                rows += 1
+                if rows % EXPORT_CHUNK_SIZE == 0:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue()
+        finally:
+            db_session.close()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f"attachment; filename=history.{export_format}"},
+    )
@@ -0,0 +1,44 @@
+from flask import Blueprint, Flask, Response, g, request
+from prometheus_client import CollectorRegistry, Histogram, generate_latest, multiprocess, CONTENT_TYPE_LATEST
+import os
+import time
+
+metrics_bp = Blueprint("metrics", __name__)
+
+REQUEST_DURATION = Histogram(
+    "thatworks_http_request_duration_seconds",
+    "Time spent handling API requests",
+    ["blueprint"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Prometheus metrics of this process, or of every gunicorn worker when
+    PROMETHEUS_MULTIPROC_DIR is set.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+    return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
+
+def init_request_metrics(flask_app:Flask):
+    """
+    Time every request into REQUEST_DURATION, labelled with the blueprint that handled it.
+    Call after the blueprints are registered, their label children are bound here once.
+    """
+    children = {name: REQUEST_DURATION.labels(name) for name in flask_app.blueprints}
+    # 404s and the like are not routed to any blueprint
+    unrouted = REQUEST_DURATION.labels("none")
+
+    @flask_app.before_request
+    def start_request_timer():
+        g.request_start = time.perf_counter()
+
+    @flask_app.teardown_request
+    def observe_request_duration(exc):
+        start = g.pop("request_start", None)
+        if start is not None:
+            children.get(request.blueprint, unrouted).observe(time.perf_counter() - start)
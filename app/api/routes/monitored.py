@@ -1,13 +1,19 @@
 from flask import Blueprint, request, jsonify
-from app.utils import validate_url, validate_timeout
-from app.db import get_db
-from app.models import MonitoredUrl
+from app.utils import validate_url, validate_timeout, validate_check_interval, validate_limit, next_slot
+from app.db import request_db
+from app.models import MonitoredUrl, LatestCheck
+from app.services import notify_url_changed, notify_urls_reloaded
+from sqlalchemy import delete, or_, case, func, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timezone
+import base64
+import json
 
 monitored_bp = Blueprint("monitored", __name__, url_prefix="/api/v1/monitored")
 
-MIN_INTERVAL_SECONDS = 60 # 1 minute
-MAX_INTERVAL_SECONDS = 3600 # 1 hour
+BULK_MAX_ITEMS = 10000 # items accepted by one bulk request
+BULK_CHUNK_SIZE = 1000 # rows written per statement
 
 @monitored_bp.route("/urls", methods=['POST'])
 def add_url():
@@ -37,18 +43,10 @@ def add_url():
     name = data.get("name")
     
     check_interval_s = data.get("check_interval", "")
-    if check_interval_s == "":
-        return jsonify({
-        "error": "Missing required field: 'check_interval'"
-        }), 400
-    if not isinstance(check_interval_s, (int, float)):
-        return jsonify({
-            "error": "Invalid check_interval format"
-        }), 400
-
-    if check_interval_s < MIN_INTERVAL_SECONDS or check_interval_s > MAX_INTERVAL_SECONDS:
+    is_valid, error = validate_check_interval(check_interval_s)
+    if not is_valid:
         return jsonify({
-            "error": f"Check interval must be between {MIN_INTERVAL_SECONDS} and {MAX_INTERVAL_SECONDS}"
+            "error": error
         }), 400
         
     timeout_s = data.get("timeout", "")
@@ -60,16 +58,20 @@ def add_url():
 
     is_active = data.get("is_active", True)
 
-    db_session = get_db()
+    db_session = request_db()
     try:
         mu = MonitoredUrl(
             url=url,
             name=name,
             check_interval_s=check_interval_s,
             timeout_s=timeout_s,
-            is_active=is_active
+            is_active=is_active,
+            # the first check lands on the url's slot, spreading new urls over their interval
+            next_check_at=next_slot(url, check_interval_s, datetime.now(timezone.utc)),
         )
         db_session.add(mu)
+        db_session.flush()
+        notify_url_changed(db_session, mu)
         db_session.commit()
         db_session.refresh(mu)
         return jsonify({
@@ -86,8 +88,95 @@ def add_url():
         return jsonify({
             "error": f"Database error: {str(e)}"
         }), 500
-    finally:
-        db_session.close()
+
+def encode_cursor(url_id:int)->str:
+    return base64.urlsafe_b64encode(json.dumps([url_id]).encode()).decode()
+
+def decode_cursor(cursor:str)->int:
+    (url_id,) = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return int(url_id)
+
+def parse_bool(value:str)->bool|None:
+    return {"true": True, "false": False}.get(value.lower())
+
+@monitored_bp.route("/urls", methods=['GET'])
+def list_urls():
+    """
+    List the monitored urls, by id, each with its latest check.
+    Query params
+        - active: true or false, only active or inactive urls
+        - failing: true for urls whose latest check was unhealthy, false for the others
+        - name_prefix: only urls whose name starts with it
+        - limit: Maximum number of results (default 100, max 1000)
+        - cursor: next_cursor from the previous page, to fetch the page after it
+    """
+    filters = {}
+    for param in ("active", "failing"):
+        if request.args.get(param):
+            filters[param] = parse_bool(request.args[param])
+            if filters[param] is None:
+                return jsonify({
+                    "error": f"{param} must be true or false"
+                }), 400
+    name_prefix = request.args.get("name_prefix", "")
+    cursor = request.args.get("cursor", "")
+    if cursor:
+        try:
+            cursor_id = decode_cursor(cursor)
+        except (ValueError, TypeError):
+            return jsonify({
+                "error": "Invalid cursor"
+            }), 400
+    limit = request.args.get("limit", "100")
+    is_valid, error = validate_limit(limit)
+    if not is_valid:
+        return jsonify({
+            "error": error
+        }), 400
+    limit = min(int(limit), 1000)
+
+    db_session = request_db()
+    # latest_checks is maintained as results are written, so this is one join on its
+    # primary key instead of a search through health_checks for every url
+    query = (
+        db_session.query(MonitoredUrl, LatestCheck)
+        .outerjoin(LatestCheck, LatestCheck.url == MonitoredUrl.url)
+    )
+    if "active" in filters:
+        query = query.filter(MonitoredUrl.is_active == filters["active"])
+    if filters.get("failing") is True:
+        query = query.filter(LatestCheck.is_healthy == False)
+    elif filters.get("failing") is False:
+        query = query.filter(or_(LatestCheck.is_healthy == True, LatestCheck.url == None))
+    if name_prefix:
+        query = query.filter(MonitoredUrl.name.startswith(name_prefix, autoescape=True))
+    if cursor:
+        query = query.filter(MonitoredUrl.id > cursor_id)
+
+    rows = query.order_by(MonitoredUrl.id).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][0].id)
+
+    return jsonify({
+        "count": len(rows),
+        "filters": {
+            **filters,
+            "name_prefix": name_prefix,
+            "limit": limit,
+        },
+        "urls": [
+            {
+                **monitored.to_dict(),
+                "next_check_at": monitored.next_check_at.isoformat() if monitored.next_check_at else None,
+                "consecutive_failures": monitored.consecutive_failures,
+                "latest_check": latest.to_dict() if latest else None,
+            }
+            for monitored, latest in rows
+        ],
+        "next_cursor": next_cursor,
+    })
 
 @monitored_bp.route("/urls/<int:url_id>", methods=['GET'])
 def get_url(url_id:int):
@@ -96,16 +185,13 @@ def get_url(url_id:int):
     Query params
         "url_id": id of the URL to fetch
     """
-    db_session = get_db()
-    try:
-        monitored = db_session.query(MonitoredUrl).filter(MonitoredUrl.id == url_id).first()
-        if not monitored:
-            return jsonify({
-                "error": "Monitored URL not found"
-            }), 404
-        return jsonify(monitored.to_dict()), 200
-    finally:
-        db_session.close()
+    db_session = request_db()
+    monitored = db_session.query(MonitoredUrl).filter(MonitoredUrl.id == url_id).first()
+    if not monitored:
+        return jsonify({
+            "error": "Monitored URL not found"
+        }), 404
+    return jsonify(monitored.to_dict()), 200
 
 @monitored_bp.route("/urls/<int:url_id>", methods=['DELETE'])
 def delete_url(url_id:int):
@@ -114,7 +200,7 @@ def delete_url(url_id:int):
     Query params
         "url_id": id of the URL
     """
-    db_session = get_db()
+    db_session = request_db()
     try:
         monitored = db_session.query(MonitoredUrl).filter(MonitoredUrl.id == url_id).first()
         if not monitored:
@@ -122,6 +208,8 @@ def delete_url(url_id:int):
                 "error": "Monitored URL not found"
             }), 404
         db_session.delete(monitored)
+        db_session.execute(delete(LatestCheck).where(LatestCheck.url == monitored.url))
+        notify_url_changed(db_session, deleted_id=url_id)
         db_session.commit()
         return jsonify({
             "message": f"URL removed from monitoring"
@@ -131,9 +219,6 @@ def delete_url(url_id:int):
         return jsonify({
             "error": f"Database error: {str(e)}"
         }), 500
-        
-    finally:
-        db_session.close()
 
 @monitored_bp.route("/urls/<int:url_id>", methods=['PUT'])
 def update_url(url_id:int):
@@ -167,14 +252,10 @@ def update_url(url_id:int):
     
     if "check_interval" in data:
         atleast_one = True
-        if not isinstance(data.get("check_interval"), (int, float)):
-            return jsonify({
-                "error": "Invalid check_interval format"
-            }), 400
-
-        if data.get("check_interval") < MIN_INTERVAL_SECONDS or data.get("check_interval") > MAX_INTERVAL_SECONDS:
+        is_valid, error = validate_check_interval(data["check_interval"])
+        if not is_valid:
             return jsonify({
-                "error": f"Check interval must be between {MIN_INTERVAL_SECONDS} and {MAX_INTERVAL_SECONDS}"
+                "error": error
             }), 400
         
     if "timeout" in data:
@@ -191,7 +272,7 @@ def update_url(url_id:int):
         return jsonify({
             "error": "Atleast one field must be updated"
         }), 400
-    db_session = get_db()
+    db_session = request_db()
     try:
         monitored = db_session.query(MonitoredUrl).filter(MonitoredUrl.id == url_id).first()
         if not monitored:
@@ -201,12 +282,14 @@ def update_url(url_id:int):
 
         if "name" in data:
             monitored.name = data["name"]
-        if "check_interval" in data:
+        if "check_interval" in data and data["check_interval"] != monitored.check_interval_s:
             monitored.check_interval_s = data["check_interval"]
+            monitored.next_check_at = next_slot(monitored.url, monitored.check_interval_s, datetime.now(timezone.utc))
         if "timeout" in data:
             monitored.timeout_s = data["timeout"]
         if "is_active" in data:
             monitored.is_active = data['is_active']
+        notify_url_changed(db_session, monitored)
         db_session.commit()
         db_session.refresh(monitored)
         return jsonify({
@@ -218,7 +301,225 @@ def update_url(url_id:int):
         return jsonify({
             "error": f"Database error: {str(e)}"
         }), 500
-    finally:
-        db_session.close()
 
-    
+def parse_bulk_items()->tuple[list|None, str|None]:
+    """Read the items of a bulk request, sent as a JSON array or as NDJSON, one object per line."""
+    try:
+        if request.mimetype == "application/x-ndjson":
+            items = [json.loads(line) for line in request.get_data(as_text=True).splitlines() if line.strip()]
+        elif request.is_json:
+            items = request.get_json(silent=True)
+            if items is None:
+                return None, "Invalid JSON"
+        else:
+            return None, "JSON array or NDJSON (application/x-ndjson) expected"
+    except ValueError as e:
+        return None, f"Invalid JSON: {str(e)}"
+    if not isinstance(items, list):
+        return None, "JSON array expected"
+    if len(items) > BULK_MAX_ITEMS:
+        return None, f"At most {BULK_MAX_ITEMS} items per request"
+    return items, None
+
+def validate_bulk_item(item)->tuple[dict|None, str|None]:
+    """Validate one item of a bulk create or upsert, returns the monitored_urls row to write."""
+    if not isinstance(item, dict):
+        return None, "JSON object expected"
+    url = item.get("url", "")
+    url = url.strip() if isinstance(url, str) else url
+    for is_valid, error in (
+        validate_url(url) if isinstance(url, str) else (False, "Invalid URL format"),
+        validate_check_interval(item.get("check_interval", "")),
+        validate_timeout(item.get("timeout", "")),
+    ):
+        if not is_valid:
+            return None, error
+    is_active = item.get("is_active", True)
+    if not isinstance(is_active, bool):
+        return None, "Invalid is_active format"
+    return {
+        "url": url,
+        "name": item.get("name"),
+        "check_interval_s": item["check_interval"],
+        "timeout_s": item["timeout"],
+        "is_active": is_active,
+        "next_check_at": next_slot(url, item["check_interval"], datetime.now(timezone.utc)),
+    }, None
+
+def write_bulk(rows:list[dict], upsert:bool)->dict[str, tuple[int, bool]]:
+    """
+    Insert the rows with INSERT ... ON CONFLICT (url), BULK_CHUNK_SIZE rows per statement,
+    in one transaction. Existing urls are skipped, or updated when upsert is set.
+    Response
+        dict - url -> (id, created) of every row written
+    """
+    written = {}
+    db_session = request_db()
+    try:
+        for start in range(0, len(rows), BULK_CHUNK_SIZE):
+            stmt = pg_insert(MonitoredUrl).values(rows[start:start + BULK_CHUNK_SIZE])
+            if upsert:
+                excluded = stmt.excluded
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[MonitoredUrl.url],
+                    set_={
+                        "name": excluded.name,
+                        "check_interval_s": excluded.check_interval_s,
+                        "timeout_s": excluded.timeout_s,
+                        "is_active": excluded.is_active,
+                        # a new interval means a new slot, otherwise the schedule is kept
+                        "next_check_at": case(
+                            (MonitoredUrl.check_interval_s != excluded.check_interval_s, excluded.next_check_at),
+                            else_=MonitoredUrl.next_check_at,
+                        ),
+                        "updated_at": func.now(),
+                    },
+                )
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=[MonitoredUrl.url])
+            # xmax is 0 on an inserted row and set on an updated one
+            stmt = stmt.returning(MonitoredUrl.id, MonitoredUrl.url, literal_column("xmax = 0"))
+            for url_id, url, created in db_session.execute(stmt):
+                written[url] = (url_id, created)
+        if written:
+            notify_urls_reloaded(db_session)
+        db_session.commit()
+        return written
+    except Exception:
+        db_session.rollback()
+        raise
+
+def bulk_create_or_upsert(upsert:bool):
+    items, error = parse_bulk_items()
+    if error:
+        return jsonify({
+            "error": error
+        }), 400
+
+    results = []
+    rows = []
+    seen = set()
+    for index, item in enumerate(items):
+        row, error = validate_bulk_item(item)
+        if error:
+            results.append({"index": index, "url": item.get("url") if isinstance(item, dict) else None, "status": "invalid", "error": error})
+            continue
+        if row["url"] in seen:
+            results.append({"index": index, "url": row["url"], "status": "duplicate", "error": "URL appears earlier in the request"})
+            continue
+        seen.add(row["url"])
+        rows.append(row)
+        results.append({"index": index, "url": row["url"], "status": None})
+
+    try:
+        written = write_bulk(rows, upsert) if rows else {}
+    except Exception as e:
+        return jsonify({
+            "error": f"Database error: {str(e)}"
+        }), 500
+
+    for result in results:
+        if result["status"] is not None:
+            continue
+        if result["url"] in written:
+            url_id, created = written[result["url"]]
+            result["id"] = url_id
+            result["status"] = "created" if created else "updated"
+        else:
+            result["status"] = "exists"
+            result["error"] = "URL already exists in monitoring"
+
+    counts = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    return jsonify({
+        "count": len(results),
+        "summary": counts,
+        "results": results,
+    }), 200
+
+@monitored_bp.route("/urls/bulk", methods=['POST'])
+def bulk_add_urls():
+    """
+    Add many monitored urls in one request. URLs already monitored are reported
+    as "exists" and left unchanged.
+    Request body: a JSON array, or NDJSON (application/x-ndjson) with one object per
+    line, of objects with the fields of POST /urls, at most BULK_MAX_ITEMS of them.
+    Response: a result per item, in request order, with a status of created,
+    exists, duplicate or invalid.
+    """
+    return bulk_create_or_upsert(upsert=False)
+
+@monitored_bp.route("/urls/bulk", methods=['PUT'])
+def bulk_upsert_urls():
+    """
+    Add or update many monitored urls in one request, matched on url.
+    Request body: as POST /urls/bulk. Every field of an existing url is overwritten.
+    Response: a result per item, in request order, with a status of created,
+    updated, duplicate or invalid.
+    """
+    return bulk_create_or_upsert(upsert=True)
+
+@monitored_bp.route("/urls/bulk", methods=['DELETE'])
+def bulk_delete_urls():
+    """
+    Delete many monitored urls in one request.
+    Request body: a JSON array or NDJSON of objects with either "id" or "url".
+    Response: a result per item, in request order, with a status of deleted,
+    not_found or invalid.
+    """
+    items, error = parse_bulk_items()
+    if error:
+        return jsonify({
+            "error": error
+        }), 400
+
+    ids = set()
+    urls = set()
+    for item in items:
+        if isinstance(item, dict) and isinstance(item.get("id"), int) and not isinstance(item.get("id"), bool):
+            ids.add(item["id"])
+        elif isinstance(item, dict) and isinstance(item.get("url"), str):
+            urls.add(item["url"].strip())
+
+    deleted_ids = set()
+    deleted_urls = set()
+    if ids or urls:
+        db_session = request_db()
+        try:
+            stmt = (
+                delete(MonitoredUrl)
+                .where(or_(MonitoredUrl.id.in_(ids), MonitoredUrl.url.in_(urls)))
+                .returning(MonitoredUrl.id, MonitoredUrl.url)
+            )
+            for url_id, url in db_session.execute(stmt):
+                deleted_ids.add(url_id)
+                deleted_urls.add(url)
+            if deleted_ids:
+                db_session.execute(delete(LatestCheck).where(LatestCheck.url.in_(deleted_urls)))
+                notify_urls_reloaded(db_session)
+            db_session.commit()
+        except Exception as e:
+            db_session.rollback()
+            return jsonify({
+                "error": f"Database error: {str(e)}"
+            }), 500
+
+    results = []
+    counts = {}
+    for index, item in enumerate(items):
+        if isinstance(item, dict) and isinstance(item.get("id"), int) and not isinstance(item.get("id"), bool):
+            result = {"index": index, "id": item["id"], "status": "deleted" if item["id"] in deleted_ids else "not_found"}
+        elif isinstance(item, dict) and isinstance(item.get("url"), str):
+            url = item["url"].strip()
+            result = {"index": index, "url": url, "status": "deleted" if url in deleted_urls else "not_found"}
+        else:
+            result = {"index": index, "status": "invalid", "error": "Either 'id' or 'url' is required"}
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+        results.append(result)
+    return jsonify({
+        "count": len(results),
+        "summary": counts,
+        "results": results,
+    }), 200
+
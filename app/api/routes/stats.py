@@ -0,0 +1,60 @@
+from flask import Blueprint, request, jsonify
+from app.db import request_db
+from app.models import CheckRollup
+from app.services.rollups import GRANULARITIES, bucket_start, summarize
+from datetime import datetime, timezone, timedelta
+
+stats_bp = Blueprint("stats", __name__, url_prefix="/api/v1")
+
+MAX_HOURS = 24 * 90 # 90 days
+
+@stats_bp.route("/stats", methods=['GET'])
+def get_stats():
+    """
+    Return uptime and latency percentiles for a URL, read from the check rollups.
+    Query params
+        - url: The URL to report on
+        - hours: Report on the last N hours (defaults to 24, max 2160)
+        - granularity: minute, hour or day buckets (defaults to hour)
+    """
+    url = request.args.get("url", "")
+    if not url:
+        return jsonify({
+            "error": "Missing required field: 'url'"
+        }), 400
+
+    granularity = request.args.get("granularity", "hour")
+    if granularity not in GRANULARITIES:
+        return jsonify({
+            "error": f"granularity must be one of {', '.join(GRANULARITIES)}"
+        }), 400
+
+    hours = request.args.get("hours", 24, type=int)
+    if hours is None or hours < 1 or hours > MAX_HOURS:
+        return jsonify({
+            "error": f"hours must be between 1 and {MAX_HOURS}"
+        }), 400
+    since = bucket_start(datetime.now(timezone.utc) - timedelta(hours=hours), granularity)
+
+    db_session = request_db()
+    rollups = (
+        db_session.query(CheckRollup)
+        .filter(CheckRollup.url == url)
+        .filter(CheckRollup.granularity == granularity)
+        .filter(CheckRollup.bucket_start >= since)
+        .order_by(CheckRollup.bucket_start)
+        .all()
+    )
+
+    return jsonify({
+        "url": url,
+        "filters": {
+            "hours": hours,
+            "granularity": granularity,
+        },
+        "summary": summarize(rollups),
+        "buckets": [
+            {"bucket_start": rollup.bucket_start.isoformat(), **summarize([rollup])}
+            for rollup in rollups
+        ],
+    })
@@ -1,3 +1,3 @@
-from .connection import init_db, get_db, get_engine
+from .connection import init_db, get_db, get_engine, request_db, close_request_db, pool_stats
 
-__all__ = ['init_db', 'get_db', 'get_engine']
+__all__ = ['init_db', 'get_db', 'get_engine', 'request_db', 'close_request_db', 'pool_stats']
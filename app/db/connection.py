@@ -1,12 +1,99 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, exc
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+from flask import g
+from prometheus_client import Counter, Gauge, Histogram
+import os
+import threading
+import time
+
+# every gunicorn worker has a pool of its own, so the database sees up to
+# workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections from the API
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5)) # connections kept open
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 5)) # extra connections opened under load and closed after
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10)) # seconds to wait for a connection before failing
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800)) # seconds before a connection is replaced, -1 never
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true" # test connections on checkout
 
 engine = None
 Session = None
 
-def init_db(db_url):
+POOL_WAIT = Histogram(
+    "thatworks_db_pool_wait_seconds",
+    "Time spent waiting for a connection from the pool, by checkouts that got one",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30),
+)
+POOL_CHECKOUT_FAILURES = Counter(
+    "thatworks_db_pool_checkout_failures_total",
+    "Checkouts that got no connection, timed out waiting for one or failed to connect",
+    ["reason"],
+)
+POOL_TIMEOUTS = POOL_CHECKOUT_FAILURES.labels("timeout")
+POOL_ERRORS = POOL_CHECKOUT_FAILURES.labels("error")
+# livesum adds up the live gunicorn workers when metrics are collected across processes
+POOL_CHECKED_OUT = Gauge("thatworks_db_pool_checked_out", "Pool connections in use", multiprocess_mode="livesum")
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool that keeps count of checkouts and the time spent waiting for them, and
+    apart from those of the checkouts that failed: timeouts and connection errors.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.wait_s = 0.0
+        self.max_wait_s = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            POOL_TIMEOUTS.inc()
+            with self.stats_lock:
+                self.timeouts += 1
+            raise
+        except Exception:
+            POOL_ERRORS.inc()
+            with self.stats_lock:
+                self.errors += 1
+            raise
+        waited = time.perf_counter() - start
+        POOL_CHECKED_OUT.inc()
+        POOL_WAIT.observe(waited)
+        with self.stats_lock:
+            self.checkouts += 1
+            self.wait_s += waited
+            self.max_wait_s = max(self.max_wait_s, waited)
+        return conn
+
+    def _do_return_conn(self, record):
+        POOL_CHECKED_OUT.dec()
+        super()._do_return_conn(record)
+
+    def recreate(self):
+        # dispose() swaps in a new pool, the stats are carried over
+        pool = super().recreate()
+        with self.stats_lock:
+            pool.checkouts, pool.timeouts, pool.errors = self.checkouts, self.timeouts, self.errors
+            pool.wait_s, pool.max_wait_s = self.wait_s, self.max_wait_s
+        return pool
+
+def init_db(db_url, pool_size:int=DB_POOL_SIZE, max_overflow:int=DB_MAX_OVERFLOW, pool_timeout:float=DB_POOL_TIMEOUT,
+            pool_recycle:int=DB_POOL_RECYCLE, pool_pre_ping:bool=DB_POOL_PRE_PING):
     global engine, Session
-    engine = create_engine(db_url)
+    engine = create_engine(
+        db_url,
+        poolclass=TimedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=pool_recycle,
+        pool_pre_ping=pool_pre_ping,
+    )
     Session = sessionmaker(bind=engine)
 
 def get_db():
@@ -14,6 +101,40 @@ def get_db():
         raise RuntimeError("Database is not yet initialized. Call init_db first.")
     return Session()
 
+def request_db():
+    """
+    Session of the current request, opened on first use and closed by close_request_db
+    when the request ends, so no early return can leave a connection checked out.
+    """
+    if "db_session" not in g:
+        g.db_session = get_db()
+    return g.db_session
+
+def close_request_db(exc=None):
+    db_session = g.pop("db_session", None)
+    if db_session is not None:
+        db_session.close()
+
+def pool_stats()->dict:
+    """Connection pool usage of this process, empty before init_db."""
+    if engine is None:
+        return {}
+    pool = engine.pool
+    with pool.stats_lock:
+        checkouts, timeouts, errors = pool.checkouts, pool.timeouts, pool.errors
+        wait_s, max_wait_s = pool.wait_s, pool.max_wait_s
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "checkouts": checkouts,
+        "timeouts": timeouts,
+        "errors": errors,
+        "avg_wait_ms": wait_s / checkouts * 1000 if checkouts else None,
+        "max_wait_ms": max_wait_s * 1000 if checkouts else None,
+    }
+
 def get_engine():
     global engine
     return engine
@@ -0,0 +1,28 @@
+"""Added check_jobs.started_at, when a worker picked the job up
+
+Revision ID: v0.10
+Revises: v0.9
+Create Date: 2026-10-18 19:12:40.318265
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'v0.10'
+down_revision: Union[str, Sequence[str], None] = 'v0.9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('check_jobs', sa.Column('started_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('check_jobs', 'started_at')
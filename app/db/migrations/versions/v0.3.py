@@ -0,0 +1,86 @@
+"""Range partition health_checks by day on created_at
+
+Revision ID: v0.3
+Revises: v0.2_3
+Create Date: 2026-10-18 10:12:37.512604
+
+"""
+from typing import Sequence, Union
+from datetime import datetime, timezone, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'v0.3'
+down_revision: Union[str, Sequence[str], None] = 'v0.2_3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PREMAKE_DAYS = 7
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keep the existing rows where they are: the old table becomes the partition for
+    # everything up to the end of today (or of its newest row), so no data is copied.
+    op.rename_table('health_checks', 'health_checks_legacy')
+    op.drop_constraint('health_checks_pkey', 'health_checks_legacy', type_='primary')
+    op.execute("ALTER INDEX ix_health_checks_url RENAME TO ix_health_checks_legacy_url")
+    op.execute("ALTER INDEX ix_health_checks_created_at RENAME TO ix_health_checks_legacy_created_at")
+
+    newest = op.get_bind().execute(sa.text("SELECT max(created_at) FROM health_checks_legacy")).scalar()
+    first_day = datetime.now(timezone.utc)
+    if newest is not None and newest > first_day:
+        first_day = newest
+    first_day = first_day.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+    # The partition key has to be part of the primary key
+    op.execute("""
+        CREATE TABLE health_checks (
+            id INTEGER NOT NULL DEFAULT nextval('health_checks_id_seq'),
+            url VARCHAR NOT NULL,
+            timeout_s INTEGER NOT NULL,
+            status_code INTEGER,
+            is_healthy BOOLEAN NOT NULL,
+            response_time_ms FLOAT,
+            error VARCHAR,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("ALTER SEQUENCE health_checks_id_seq OWNED BY health_checks.id")
+    op.create_index(op.f('ix_health_checks_url'), 'health_checks', ['url'], unique=False)
+    op.create_index(op.f('ix_health_checks_created_at'), 'health_checks', ['created_at'], unique=False)
+
+    op.execute(
+        f"ALTER TABLE health_checks ATTACH PARTITION health_checks_legacy "
+        f"FOR VALUES FROM (MINVALUE) TO ('{first_day.isoformat()}')"
+    )
+    for day in range(PREMAKE_DAYS):
+        start = first_day + timedelta(days=day)
+        end = start + timedelta(days=1)
+        op.execute(
+            f"CREATE TABLE health_checks_p{start:%Y%m%d} PARTITION OF health_checks "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+    # Catches rows when the maintenance job has fallen behind
+    op.execute("CREATE TABLE health_checks_default PARTITION OF health_checks DEFAULT")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE health_checks_legacy RENAME TO health_checks_unpartitioned")
+    op.execute("ALTER TABLE health_checks DETACH PARTITION health_checks_unpartitioned")
+    op.execute("INSERT INTO health_checks_unpartitioned SELECT * FROM health_checks")
+    op.execute("ALTER SEQUENCE health_checks_id_seq OWNED BY health_checks_unpartitioned.id")
+    op.drop_table('health_checks')
+    op.rename_table('health_checks_unpartitioned', 'health_checks')
+    op.drop_index('ix_health_checks_legacy_url', table_name='health_checks')
+    op.drop_index('ix_health_checks_legacy_created_at', table_name='health_checks')
+    # created by ATTACH PARTITION for the (id, created_at) primary key
+    op.drop_constraint('health_checks_legacy_pkey', 'health_checks', type_='primary')
+    op.create_primary_key('health_checks_pkey', 'health_checks', ['id'])
+    op.create_index(op.f('ix_health_checks_url'), 'health_checks', ['url'], unique=False)
+    op.create_index(op.f('ix_health_checks_created_at'), 'health_checks', ['created_at'], unique=False)
@@ -0,0 +1,78 @@
+"""Added check_rollups table for uptime and latency summaries
+
+Revision ID: v0.4
+Revises: v0.3
+Create Date: 2026-10-18 13:41:08.220517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'v0.4'
+down_revision: Union[str, Sequence[str], None] = 'v0.3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Same bounds as app.services.rollups.LATENCY_BUCKETS_MS at the time of this migration
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 75, 100, 150, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000, 30000)
+# How far back each granularity is backfilled from health_checks
+BACKFILL = {"minute": "1 day", "hour": "90 days", "day": "90 days"}
+
+
+def histogram_sql() -> str:
+    buckets = []
+    lower = None
+    for upper in LATENCY_BUCKETS_MS:
+        if lower is None:
+            buckets.append(f"count(*) FILTER (WHERE response_time_ms <= {upper})")
+        else:
+            buckets.append(f"count(*) FILTER (WHERE response_time_ms > {lower} AND response_time_ms <= {upper})")
+        lower = upper
+    buckets.append(f"count(*) FILTER (WHERE response_time_ms > {lower})")
+    return "ARRAY[" + ", ".join(buckets) + "]::integer[]"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('check_rollups',
+    sa.Column('url', sa.String(), nullable=False),
+    sa.Column('granularity', sa.String(), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('total_count', sa.Integer(), nullable=False),
+    sa.Column('healthy_count', sa.Integer(), nullable=False),
+    sa.Column('response_time_count', sa.Integer(), nullable=False),
+    sa.Column('response_time_sum', sa.Float(), nullable=False),
+    sa.Column('response_time_min', sa.Float(), nullable=True),
+    sa.Column('response_time_max', sa.Float(), nullable=True),
+    sa.Column('latency_histogram', postgresql.ARRAY(sa.Integer()), nullable=False),
+    sa.PrimaryKeyConstraint('url', 'granularity', 'bucket_start')
+    )
+
+    for granularity, window in BACKFILL.items():
+        op.execute(f"""
+            INSERT INTO check_rollups
+            SELECT
+                url,
+                '{granularity}',
+                date_trunc('{granularity}', created_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+                count(*),
+                count(*) FILTER (WHERE is_healthy),
+                count(response_time_ms),
+                coalesce(sum(response_time_ms), 0),
+                min(response_time_ms),
+                max(response_time_ms),
+                {histogram_sql()}
+            FROM health_checks
+            WHERE created_at >= date_trunc('{granularity}', now() - interval '{window}')
+            GROUP BY 1, 2, 3
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('check_rollups')
@@ -0,0 +1,29 @@
+"""Added url, created_at, id index on health_checks for keyset pagination
+
+Revision ID: v0.5
+Revises: v0.4
+Create Date: 2026-10-18 15:02:51.730146
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'v0.5'
+down_revision: Union[str, Sequence[str], None] = 'v0.4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Created on the partitioned parent, so every partition, present and future, gets it
+    op.create_index('idx_url_created_id', 'health_checks', ['url', sa.text('created_at DESC'), sa.text('id DESC')], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_url_created_id', table_name='health_checks')
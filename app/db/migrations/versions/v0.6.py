@@ -0,0 +1,41 @@
+"""Added probe timing phases to health_checks and check_rollups
+
+Revision ID: v0.6
+Revises: v0.5
+Create Date: 2026-10-18 16:21:08.904517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'v0.6'
+down_revision: Union[str, Sequence[str], None] = 'v0.5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TIMING_PHASES = ('dns_ms', 'connect_ms', 'tls_ms', 'ttfb_ms', 'transfer_ms')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nullable columns without a default, so adding them to the partitioned parent
+    # is a catalog change only and every partition gets them
+    for phase in TIMING_PHASES:
+        op.add_column('health_checks', sa.Column(phase, sa.Float(), nullable=True))
+    # Older buckets have no timings, they start from zero
+    for phase in TIMING_PHASES:
+        op.add_column('check_rollups', sa.Column(f'{phase}_sum', sa.Float(), nullable=False, server_default='0'))
+        op.add_column('check_rollups', sa.Column(f'{phase}_count', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for phase in reversed(TIMING_PHASES):
+        op.drop_column('check_rollups', f'{phase}_count')
+        op.drop_column('check_rollups', f'{phase}_sum')
+    for phase in reversed(TIMING_PHASES):
+        op.drop_column('health_checks', phase)
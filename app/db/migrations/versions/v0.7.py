@@ -0,0 +1,35 @@
+"""Added scheduler_members for scheduler sharding
+
+Revision ID: v0.7
+Revises: v0.6
+Create Date: 2026-10-18 16:48:12.337815
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'v0.7'
+down_revision: Union[str, Sequence[str], None] = 'v0.6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('scheduler_members',
+    sa.Column('instance_id', sa.String(), nullable=False),
+    sa.Column('started_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('heartbeat_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('instance_id')
+    )
+    op.create_index(op.f('ix_scheduler_members_heartbeat_at'), 'scheduler_members', ['heartbeat_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_scheduler_members_heartbeat_at'), table_name='scheduler_members')
+    op.drop_table('scheduler_members')
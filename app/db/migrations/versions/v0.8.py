@@ -0,0 +1,52 @@
+"""Added latest_checks, the newest check of every url
+
+Revision ID: v0.8
+Revises: v0.7
+Create Date: 2026-10-18 17:21:40.118274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'v0.8'
+down_revision: Union[str, Sequence[str], None] = 'v0.7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('latest_checks',
+    sa.Column('url', sa.String(), nullable=False),
+    sa.Column('check_id', sa.Integer(), nullable=False),
+    sa.Column('status_code', sa.Integer(), nullable=True),
+    sa.Column('is_healthy', sa.Boolean(), nullable=False),
+    sa.Column('response_time_ms', sa.Float(), nullable=True),
+    sa.Column('error', sa.String(), nullable=True),
+    sa.Column('checked_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('url')
+    )
+    op.create_index('idx_monitored_name_prefix', 'monitored_urls', ['name'], unique=False, postgresql_ops={'name': 'text_pattern_ops'})
+
+    # One index probe on idx_url_created_id per monitored url, instead of a scan of every partition
+    op.execute("""
+        INSERT INTO latest_checks (url, check_id, status_code, is_healthy, response_time_ms, error, checked_at)
+        SELECT hc.url, hc.id, hc.status_code, hc.is_healthy, hc.response_time_ms, hc.error, hc.created_at
+        FROM monitored_urls m
+        CROSS JOIN LATERAL (
+            SELECT * FROM health_checks
+            WHERE health_checks.url = m.url
+            ORDER BY created_at DESC, id DESC
+            LIMIT 1
+        ) hc
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_monitored_name_prefix', table_name='monitored_urls', postgresql_ops={'name': 'text_pattern_ops'})
+    op.drop_table('latest_checks')
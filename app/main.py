@@ -1,7 +1,9 @@
 from flask import Flask
 from datetime import datetime, timezone
+import atexit
 import os
-from app.db import init_db
+from app.db import init_db, get_db, close_request_db
+from app.services import ResultSink, ResultCache, CheckJobRunner, BatchChecker
 def create_app():
     flask_app = Flask("thatworks-monitor")
 
@@ -12,13 +14,44 @@ def create_app():
     db_url = os.getenv("DATABASE_URL")
     if db_url:
         init_db(db_url)
+        # routes share one session per request through request_db(), closed here
+        flask_app.teardown_appcontext(close_request_db)
+        # runs the probes of /api/v1/check/async off the request threads
+        check_jobs = CheckJobRunner(get_db)
+        atexit.register(check_jobs.close)
+        flask_app.extensions['check_jobs'] = check_jobs
+        # opt-in: buffer /check results and write them in bulk
+        if os.getenv("RESULT_SINK", "false").lower() == "true":
+            sink = ResultSink(
+                get_db,
+                max_batch=int(os.getenv("SINK_BATCH_SIZE", 500)),
+                flush_interval=float(os.getenv("SINK_FLUSH_INTERVAL", 1.0)),
+                max_buffer=int(os.getenv("SINK_MAX_BUFFER", 10000)),
+            )
+            atexit.register(sink.close)
+            flask_app.extensions['result_sink'] = sink
+
+    # probes the urls of /api/v1/check/batch requests concurrently
+    batch_checker = BatchChecker()
+    atexit.register(batch_checker.close)
+    flask_app.extensions['check_batch'] = batch_checker
+
+    # opt-in: answer repeated /check calls for a url from recent results
+    if os.getenv("CHECK_CACHE", "false").lower() == "true":
+        flask_app.extensions['check_cache'] = ResultCache(
+            ttl=float(os.getenv("CHECK_CACHE_TTL", 30)),
+            max_size=int(os.getenv("CHECK_CACHE_SIZE", 1000)),
+        )
 
     
-    from app.api.routes import health_bp, checks_bp, history_bp, monitored_bp
+    from app.api.routes import health_bp, checks_bp, history_bp, monitored_bp, stats_bp, metrics_bp, init_request_metrics
     flask_app.register_blueprint(health_bp)
     flask_app.register_blueprint(checks_bp)
     flask_app.register_blueprint(history_bp)
     flask_app.register_blueprint(monitored_bp)
+    flask_app.register_blueprint(stats_bp)
+    flask_app.register_blueprint(metrics_bp)
+    init_request_metrics(flask_app)
 
     return flask_app
 
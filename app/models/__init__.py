@@ -1,6 +1,9 @@
 from .base import Base
 from .health_check import HealthCheck
 from .monitored import MonitoredUrl
-from .scheduler import SchedulerLock
+from .scheduler import SchedulerLock, SchedulerMember
+from .rollup import CheckRollup
+from .latest_check import LatestCheck
+from .check_job import CheckJob
 
-__all__ = ['Base', 'HealthCheck', 'MonitoredUrl', 'SchedulerLock']
+__all__ = ['Base', 'HealthCheck', 'MonitoredUrl', 'SchedulerLock', 'SchedulerMember', 'CheckRollup', 'LatestCheck', 'CheckJob']
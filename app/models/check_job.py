@@ -0,0 +1,35 @@
+from sqlalchemy import String, Float, Integer, DateTime
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+from datetime import datetime
+from .base import Base
+
+class CheckJob(Base):
+
+    # on-demand checks accepted by /api/v1/check/async, pruned by the scheduler's maintenance
+    __tablename__ = "check_jobs"
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    url: Mapped[str] = mapped_column(String, nullable=False)
+    timeout_s: Mapped[float] = mapped_column(Float, nullable=False)
+    status: Mapped[str] = mapped_column(String, nullable=False, default="pending") # pending, done or failed
+    check_id: Mapped[int|None] = mapped_column(Integer, nullable=True)
+    result: Mapped[dict|None] = mapped_column(JSONB, nullable=True) # as returned by /api/v1/check
+    error: Mapped[str|None] = mapped_column(String, nullable=True) # why the job itself failed
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
+    started_at: Mapped[datetime|None] = mapped_column(DateTime(timezone=True), nullable=True) # when a worker picked it up
+    finished_at: Mapped[datetime|None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "url": self.url,
+            "timeout_seconds": self.timeout_s,
+            "status": self.status,
+            "check_id": self.check_id,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
@@ -1,4 +1,4 @@
-from sqlalchemy import String, Float, Integer, Boolean, DateTime
+from sqlalchemy import String, Float, Integer, Boolean, DateTime, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import func
 from datetime import datetime
@@ -6,16 +6,30 @@ from .base import Base
 
 class HealthCheck(Base):
 
+    # range partitioned by day on created_at, see scheduler/maintenance.py
     __tablename__ = "health_checks"
-    id: Mapped[int] = mapped_column(primary_key=True)
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     url: Mapped[str] = mapped_column(String, nullable=False, index=True)
     timeout_s: Mapped[int] = mapped_column(Integer, nullable=False)
     status_code: Mapped[int|None] = mapped_column(Integer, nullable=True)
     is_healthy: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
     response_time_ms: Mapped[float|None] = mapped_column(Float, nullable=True)
     error: Mapped[str|None] = mapped_column(String, nullable=True)
+    # phases of response_time_ms, in milliseconds. Null when the phase did not run,
+    # e.g. dns_ms, connect_ms and tls_ms on a reused keep-alive connection
+    dns_ms: Mapped[float|None] = mapped_column(Float, nullable=True)
+    connect_ms: Mapped[float|None] = mapped_column(Float, nullable=True)
+    tls_ms: Mapped[float|None] = mapped_column(Float, nullable=True)
+    ttfb_ms: Mapped[float|None] = mapped_column(Float, nullable=True)
+    transfer_ms: Mapped[float|None] = mapped_column(Float, nullable=True)
 
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True, primary_key=True)
+
+    __table_args__ = (
+        # serves the newest-first, keyset paginated history of a url
+        Index("idx_url_created_id", "url", created_at.desc(), id.desc()),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     def to_dict(self):
         return {
@@ -26,6 +40,11 @@ class HealthCheck(Base):
             "is_healthy": self.is_healthy,
             "response_time_ms": self.response_time_ms,
             "error": self.error,
+            "dns_ms": self.dns_ms,
+            "connect_ms": self.connect_ms,
+            "tls_ms": self.tls_ms,
+            "ttfb_ms": self.ttfb_ms,
+            "transfer_ms": self.transfer_ms,
             "created_at": self.created_at.isoformat(),
         }
 
@@ -0,0 +1,26 @@
+from sqlalchemy import String, Float, Integer, Boolean, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+from .base import Base
+
+class LatestCheck(Base):
+
+    # the newest health_checks row of every url, kept up to date as results are written
+    __tablename__ = "latest_checks"
+    url: Mapped[str] = mapped_column(String, primary_key=True)
+    check_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    status_code: Mapped[int|None] = mapped_column(Integer, nullable=True)
+    is_healthy: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    response_time_ms: Mapped[float|None] = mapped_column(Float, nullable=True)
+    error: Mapped[str|None] = mapped_column(String, nullable=True)
+    checked_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    def to_dict(self):
+        return {
+            "check_id": self.check_id,
+            "status_code": self.status_code,
+            "is_healthy": self.is_healthy,
+            "response_time_ms": self.response_time_ms,
+            "error": self.error,
+            "checked_at": self.checked_at.isoformat(),
+        }
@@ -27,6 +27,8 @@ class MonitoredUrl(Base):
 
     __table_args__ = (
         Index("idx_active_next_check", "is_active", "next_check_at"),
+        # serves the name prefix filter of the listing
+        Index("idx_monitored_name_prefix", "name", postgresql_ops={"name": "text_pattern_ops"}),
     )
 
     def to_dict(self):
@@ -0,0 +1,33 @@
+from sqlalchemy import String, Float, Integer, DateTime
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+from .base import Base
+
+class CheckRollup(Base):
+
+    # one row per url per minute, hour or day bucket, kept up to date as results are written
+    __tablename__ = "check_rollups"
+    url: Mapped[str] = mapped_column(String, primary_key=True)
+    granularity: Mapped[str] = mapped_column(String, primary_key=True)
+    bucket_start: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+
+    total_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    healthy_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    response_time_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    response_time_sum: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+    response_time_min: Mapped[float|None] = mapped_column(Float, nullable=True)
+    response_time_max: Mapped[float|None] = mapped_column(Float, nullable=True)
+    # sum and count of every timing phase, for the phase averages
+    dns_ms_sum: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+    dns_ms_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    connect_ms_sum: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+    connect_ms_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    tls_ms_sum: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+    tls_ms_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    ttfb_ms_sum: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+    ttfb_ms_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    transfer_ms_sum: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+    transfer_ms_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # counts per app.services.rollups.LATENCY_BUCKETS_MS bucket, used for percentiles
+    latency_histogram: Mapped[list[int]] = mapped_column(ARRAY(Integer), nullable=False)
@@ -20,3 +20,12 @@ class SchedulerLock(Base):
     __table_args__ = (
         Index("idx_expires_at", "expires_at"),
     )
+
+class SchedulerMember(Base):
+
+    # live scheduler instances, used to split the monitored urls between them when sharding
+    __tablename__ = "scheduler_members"
+
+    instance_id: Mapped[str] = mapped_column(String, primary_key=True)
+    started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    heartbeat_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
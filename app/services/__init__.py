@@ -1,3 +1,9 @@
 from .checker import check_health
+from .async_checker import AsyncChecker
+from .result_sink import ResultSink, write_results, health_check_row
+from .result_cache import ResultCache
+from .check_jobs import CheckJobRunner
+from .check_batch import BatchChecker
+from .notifications import notify_url_changed, notify_urls_reloaded, URL_CHANGES_CHANNEL
 
-__all__ = ['check_health']
+__all__ = ['check_health', 'AsyncChecker', 'ResultSink', 'write_results', 'health_check_row', 'ResultCache', 'notify_url_changed', 'notify_urls_reloaded', 'URL_CHANGES_CHANNEL', 'CheckJobRunner', 'BatchChecker']
@@ -0,0 +1,167 @@
+from typing import Optional
+from urllib.parse import urlparse
+import asyncio
+import time
+import aiohttp
+from .http_client import ProbeTimings, POOL_IDLE_TIMEOUT, FORCE_FRESH_CONNECTION
+from .checker import TIMING_PHASES
+from .dns_cache import CachingResolver
+from .throttle import host_limiter, url_host
+from .metrics import PROBE_DURATIONS, probe_outcome
+
+def probe_trace_config()->aiohttp.TraceConfig:
+    """
+    Records DNS resolution and connection setup on the ProbeTimings passed as the
+    request's trace_request_ctx. aiohttp does not report the TLS handshake on its
+    own, so for https connect_ms includes it and tls_ms stays None.
+    """
+    trace_config = aiohttp.TraceConfig()
+
+    async def on_dns_resolvehost_start(session, ctx, params):
+        ctx.dns_start = time.perf_counter_ns()
+
+    async def on_dns_resolvehost_end(session, ctx, params):
+        elapsed = time.perf_counter_ns() - ctx.dns_start
+        ctx.dns_ns = getattr(ctx, "dns_ns", 0) + elapsed
+        ctx.trace_request_ctx.add("dns_ms", elapsed)
+
+    async def on_connection_create_start(session, ctx, params):
+        ctx.connect_start = time.perf_counter_ns()
+        ctx.dns_ns = 0
+
+    async def on_connection_create_end(session, ctx, params):
+        elapsed = time.perf_counter_ns() - ctx.connect_start - ctx.dns_ns
+        ctx.trace_request_ctx.add("connect_ms", elapsed)
+
+    trace_config.on_dns_resolvehost_start.append(on_dns_resolvehost_start)
+    trace_config.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+    trace_config.on_connection_create_start.append(on_connection_create_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    return trace_config
+
+class AsyncChecker:
+    """
+    Health checks a whole batch of URLs concurrently on a private event loop.
+    Results have the same shape as check_health, and like it, targets repeated in
+    a batch share one probe and probes of one host are rate limited.
+    Args
+        max_concurrency - maximum number of probes in flight at once
+        max_per_host - maximum number of probes in flight against one host
+        idle_timeout - seconds an unused keep-alive connection is kept open
+        fresh - open a new connection for every probe instead of reusing one
+    """
+    def __init__(self, max_concurrency:int=100, max_per_host:int=4, idle_timeout:float=POOL_IDLE_TIMEOUT, fresh:bool=FORCE_FRESH_CONNECTION):
+        self.max_concurrency = max_concurrency
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+        self.fresh = fresh
+        self.loop = asyncio.new_event_loop()
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    def check_batch(self, targets:list[tuple[str, float]])->list[dict]:
+        """
+        Check the health of a batch of URLs.
+        Args
+            targets - list of (url, timeout) tuples, timeout in seconds
+        Response
+            list - one result dict per target, in the same order
+        """
+        if not targets:
+            return []
+        return self.loop.run_until_complete(self._check_batch(targets))
+
+    def close(self):
+        if self.session is not None:
+            self.loop.run_until_complete(self.session.close())
+            self.session = None
+        self.loop.close()
+
+    async def _check_batch(self, targets:list[tuple[str, float]])->list[dict]:
+        if self.session is None:
+            # the session outlives the batch, so keep-alive connections are reused by the next one
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency,
+                limit_per_host=self.max_per_host,
+                keepalive_timeout=None if self.fresh else self.idle_timeout,
+                force_close=self.fresh,
+                # names are cached by DnsCache for their record TTL instead of aiohttp's fixed 10 seconds
+                resolver=CachingResolver(),
+                use_dns_cache=False,
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                cookie_jar=aiohttp.DummyCookieJar(),
+                trace_configs=[probe_trace_config()],
+            )
+
+        # Semaphores are bound to the running loop, so build them per batch
+        global_limit = asyncio.Semaphore(self.max_concurrency)
+        host_limits = {}
+        for url, _ in targets:
+            host = urlparse(url).netloc
+            if host not in host_limits:
+                host_limits[host] = asyncio.Semaphore(self.max_per_host)
+
+        async def bounded(url, timeout):
+            async with host_limits[urlparse(url).netloc]:
+                # same per-host token buckets as check_health
+                delay = host_limiter.reserve(url_host(url))
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                async with global_limit:
+                    return await self._check_health(url, timeout)
+
+        # targets repeated in the batch share one probe
+        flights = {}
+        for url, timeout in targets:
+            if (url, timeout) not in flights:
+                flights[(url, timeout)] = asyncio.ensure_future(bounded(url, timeout))
+        results = await asyncio.gather(*(flights[target] for target in targets))
+        return [dict(result) for result in results]
+
+    async def _check_health(self, url:str, timeout:Optional[float]=10)->dict:
+        start_time = time.perf_counter_ns()
+        timings = ProbeTimings()
+
+        result = {
+            "url": url,
+            "timeout_seconds": timeout,
+            "status_code": None,
+            "status": "unhealthy",
+            "response_time_ms": None,
+            "error": None,
+        }
+        for phase in TIMING_PHASES:
+            result[phase] = None
+        try:
+            async with self.session.get(
+                url,
+                timeout=aiohttp.ClientTimeout(total=timeout),
+                allow_redirects=True,
+                trace_request_ctx=timings,
+            ) as response:
+                headers_time = time.perf_counter_ns()
+                await response.read()
+                end_time = time.perf_counter_ns()
+                result['status_code'] = response.status
+                result['status'] = "healthy" if 200 <= response.status < 400 else "unhealthy"
+                response_time = (end_time - start_time) / 1e6 # Convert to milliseconds
+                result['response_time_ms'] = response_time
+                result['ttfb_ms'] = (headers_time - start_time) / 1e6 - timings.setup_ms()
+                result['transfer_ms'] = (end_time - headers_time) / 1e6
+        except asyncio.TimeoutError:
+            result['error'] = f"Request timedout in {timeout} seconds."
+        except aiohttp.ClientSSLError:
+            result['error'] = "SSLError: SSL certificate verification failed."
+        except aiohttp.ClientConnectorDNSError:
+            result['error'] = "DNSError: Invalid domain/hostname"
+        except aiohttp.ClientConnectionError as e:
+            result['error'] = f"Connection Error: {str(e)}"
+        except Exception as e:
+            result['error'] = f"Unexpected Error: {str(e)}"
+
+        result['dns_ms'] = timings.dns_ms
+        result['connect_ms'] = timings.connect_ms
+        result['tls_ms'] = timings.tls_ms
+        PROBE_DURATIONS["async"][probe_outcome(result)].observe((time.perf_counter_ns() - start_time) / 1e9)
+        return result
@@ -0,0 +1,54 @@
+from typing import Iterator, Optional
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+from .checker import check_health
+import os
+
+CHECK_BATCH_WORKERS = int(os.getenv("CHECK_BATCH_WORKERS", 64)) # probes run at once per API process, over all batches
+CHECK_BATCH_CONCURRENCY = int(os.getenv("CHECK_BATCH_CONCURRENCY", 50)) # probes one batch may run at once
+
+class BatchChecker:
+    """
+    Checks batches of URLs on a thread pool shared by all requests. Each batch keeps
+    at most concurrency probes in flight and yields the results as they finish, so
+    a batch takes about as long as its slowest probe rather than the sum of them.
+    Probes of one host are still rate limited (see HOST_RATE_LIMIT).
+    Args
+        workers - number of probes run at once over all batches
+        max_concurrency - cap on the concurrency of one batch
+    """
+    def __init__(self, workers:int=CHECK_BATCH_WORKERS, max_concurrency:int=CHECK_BATCH_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        # threads are only started by the first submit, so the checker survives gunicorn's preload fork
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="check-batch")
+
+    def check(self, targets:list[tuple[str, float]], concurrency:Optional[int]=None)->Iterator[tuple[int, dict]]:
+        """
+        Args
+            targets - list of (url, timeout) tuples, timeout in seconds
+            concurrency - probes in flight at once (optional, defaults to and capped at max_concurrency)
+        Response
+            iterator - (index in targets, check_health result), in the order the probes finish.
+                       Closing it early cancels the probes that have not started.
+        """
+        concurrency = min(concurrency or self.max_concurrency, self.max_concurrency)
+        queued = enumerate(targets)
+        in_flight = {}
+
+        def submit(count):
+            for index, (url, timeout) in islice(queued, count):
+                in_flight[self.executor.submit(check_health, url, timeout)] = index
+
+        try:
+            submit(concurrency)
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                submit(len(done))
+                for future in done:
+                    yield in_flight.pop(future), future.result()
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
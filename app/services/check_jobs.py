@@ -0,0 +1,108 @@
+from typing import Callable, Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from app.models import CheckJob
+from .checker import check_health
+from .result_sink import write_results, health_check_row
+import os
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+CHECK_JOB_WORKERS = int(os.getenv("CHECK_JOB_WORKERS", 32)) # probes run at once per API process
+CHECK_JOB_MAX_PENDING = int(os.getenv("CHECK_JOB_MAX_PENDING", 1000)) # accepted jobs per API process before new ones are refused
+
+class CheckJobRunner:
+    """
+    Runs the checks of /api/v1/check/async on a thread pool shared by all requests,
+    so a web thread only inserts the check_jobs row and returns. The job is marked
+    done with the result and the id of its health_checks row, or failed.
+    Args
+        session_factory - callable returning a new Session
+        workers - number of probes run at once
+        max_pending - number of accepted jobs that may wait or run at once
+    """
+    def __init__(self, session_factory:Callable[[], Session], workers:int=CHECK_JOB_WORKERS, max_pending:int=CHECK_JOB_MAX_PENDING):
+        self.session_factory = session_factory
+        self.max_pending = max_pending
+        # threads are only started by the first submit, so the runner survives gunicorn's preload fork
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="check-job")
+        self.pending = {} # job id -> Event set once the job finished
+        self.lock = threading.Lock()
+
+    def submit(self, session:Session, url:str, timeout:float)->Optional[CheckJob]:
+        """
+        Record a job for url and queue its check.
+        Response
+            CheckJob - the committed job, None when max_pending jobs are already waiting
+        """
+        with self.lock:
+            if len(self.pending) >= self.max_pending:
+                return None
+        job = CheckJob(url=url, timeout_s=timeout, status="pending")
+        session.add(job)
+        session.commit()
+        with self.lock:
+            self.pending[job.id] = threading.Event()
+        self.executor.submit(self._run, job.id, url, timeout)
+        return job
+
+    def wait(self, job_id:int, timeout:float)->bool:
+        """
+        Wait up to timeout seconds for a job running in this process.
+        Response
+            bool - False when the job is not running here, it finished or runs in another process
+        """
+        with self.lock:
+            finished = self.pending.get(job_id)
+        if finished is None:
+            return False
+        finished.wait(timeout)
+        return True
+
+    def is_pending(self, job_id:int)->bool:
+        """Whether the job was accepted by this process and has not finished yet."""
+        with self.lock:
+            return job_id in self.pending
+
+    def close(self):
+        """Finish the accepted jobs and stop the workers."""
+        self.executor.shutdown(wait=True)
+
+    def _run(self, job_id:int, url:str, timeout:float):
+        session = self.session_factory()
+        try:
+            # jobs can wait for a worker long past their timeout, pollers judge them from here
+            session.execute(
+                update(CheckJob)
+                .where(CheckJob.id == job_id)
+                .values(started_at=datetime.now(timezone.utc))
+            )
+            session.commit()
+            result = check_health(url, timeout)
+            check_id = write_results(session, [health_check_row(url, timeout, result)])[0]
+            result["check_id"] = check_id
+            values = {"status": "done", "check_id": check_id, "result": result}
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Check job {job_id} for {url} failed: {str(e)}")
+            values = {"status": "failed", "error": str(e)}
+        try:
+            session.execute(
+                update(CheckJob)
+                .where(CheckJob.id == job_id)
+                .values(finished_at=datetime.now(timezone.utc), **values)
+            )
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Failed to record check job {job_id}: {str(e)}")
+        finally:
+            session.close()
+            with self.lock:
+                finished = self.pending.pop(job_id, None)
+            if finished is not None:
+                finished.set()
@@ -1,18 +1,42 @@
 from typing import Optional
 import time
 import requests
+from .http_client import http_client, start_probe_timings, FORCE_FRESH_CONNECTION
+from .throttle import host_limiter, probe_flights, url_host
+from .metrics import PROBE_DURATIONS, probe_outcome
 
-def check_health(url:str, timeout:Optional[float]=10)->dict:
+TIMING_PHASES = ("dns_ms", "connect_ms", "tls_ms", "ttfb_ms", "transfer_ms")
+
+def check_health(url:str, timeout:Optional[float]=10, fresh:Optional[bool]=None, max_age:Optional[float]=None)->dict:
     """
     Check the health of URL
     Args
         url - The URL to health check
         timeout - in seconds (optional, defaults to 10)
+        fresh - skip the connection pool and open a new connection
+                (optional, defaults to HTTP_FORCE_FRESH_CONNECTION)
+        max_age - in seconds, the oldest result of another caller's probe that may be
+                  shared, 0 waits for a probe in flight only (optional, defaults to COALESCE_WINDOW)
     Response
-        dict - containing the results
+        dict - containing the results, with the time spent in each phase of the
+               probe (dns_ms, connect_ms, tls_ms, ttfb_ms, transfer_ms). The
+               connection phases are None when a pooled connection was reused.
+    Concurrent checks of the same url share one probe (see COALESCE_WINDOW) and
+    probes of one host are rate limited (see HOST_RATE_LIMIT).
     """
+    fresh = FORCE_FRESH_CONNECTION if fresh is None else fresh
+    result, _ = probe_flights.do((url, timeout, fresh), lambda: _rate_limited_probe(url, timeout, fresh), max_age)
+    # callers add their own keys to the result, so each gets its own copy
+    return dict(result)
+
+def _rate_limited_probe(url:str, timeout:Optional[float], fresh:bool)->dict:
+    host_limiter.acquire(url_host(url))
+    return _probe(url, timeout, fresh)
+
+def _probe(url:str, timeout:Optional[float], fresh:bool)->dict:
     # record start time for response time calculation
-    start_time = time.time()
+    start_time = time.perf_counter_ns()
+    timings = start_probe_timings()
 
     # Initialize the response dictionary
     result = {
@@ -23,17 +47,20 @@ def check_health(url:str, timeout:Optional[float]=10)->dict:
         "response_time_ms": None,
         "error": None,
     }
+    for phase in TIMING_PHASES:
+        result[phase] = None
     try:
-        response = requests.get(
-            url=url,
-            timeout=timeout,
-            allow_redirects=True,
-            verify=True
-        )
+        with http_client.get(url, timeout, fresh=fresh) as response:
+            headers_time = time.perf_counter_ns()
+            response.content # read the body
+            end_time = time.perf_counter_ns()
         result['status_code'] = response.status_code
         result['status'] = "healthy" if 200 <= response.status_code < 400 else "unhealthy"
-        response_time = (time.time() - start_time) * 1000 # Convert to milliseconds
+        response_time = (end_time - start_time) / 1e6 # Convert to milliseconds
         result['response_time_ms'] = response_time
+        # time to first byte of the final response, after the connection was set up
+        result['ttfb_ms'] = (headers_time - start_time) / 1e6 - timings.setup_ms()
+        result['transfer_ms'] = (end_time - headers_time) / 1e6
     except requests.exceptions.Timeout:
         result['error'] = f"Request timedout in {timeout} seconds."
     except requests.exceptions.SSLError:
@@ -48,5 +75,9 @@ def check_health(url:str, timeout:Optional[float]=10)->dict:
     except Exception as e:
         result['error'] = f"Unexpected Error: {str(e)}"
 
+    result['dns_ms'] = timings.dns_ms
+    result['connect_ms'] = timings.connect_ms
+    result['tls_ms'] = timings.tls_ms
+    PROBE_DURATIONS["sync"][probe_outcome(result)].observe((time.perf_counter_ns() - start_time) / 1e9)
     return result
         
@@ -0,0 +1,223 @@
+from typing import Optional
+from collections import OrderedDict
+import asyncio
+import ipaddress
+import os
+import socket
+import threading
+import time
+import dns.exception
+import dns.resolver
+from aiohttp.abc import AbstractResolver
+
+DNS_CACHE_SIZE = int(os.getenv("DNS_CACHE_SIZE", 10000)) # hostnames kept in the cache
+DNS_MIN_TTL = float(os.getenv("DNS_MIN_TTL", 1)) # floor for record TTLs, in seconds
+DNS_MAX_TTL = float(os.getenv("DNS_MAX_TTL", 3600)) # ceiling for record TTLs, in seconds
+DNS_NEGATIVE_TTL = float(os.getenv("DNS_NEGATIVE_TTL", 10)) # seconds a failed lookup is remembered
+DNS_TIMEOUT = float(os.getenv("DNS_TIMEOUT", 5)) # seconds a lookup may take
+HOSTS_FILE = "/etc/hosts"
+HOSTS_TTL = 300 # hosts file entries and lookups without a resolver have no TTL
+
+def read_hosts_file(path:str=HOSTS_FILE)->set[str]:
+    names = {"localhost"}
+    try:
+        with open(path) as hosts:
+            for line in hosts:
+                fields = line.split("#", 1)[0].split()
+                names.update(name.lower() for name in fields[1:])
+    except OSError:
+        pass
+    return names
+
+def _is_address(host:str)->bool:
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+def _addrinfo(host:str, addresses:list[tuple[int, str]], port:int, family:int)->list[tuple]:
+    addrinfo = [
+        (addr_family, socket.SOCK_STREAM, socket.IPPROTO_TCP, "",
+         (address, port) if addr_family == socket.AF_INET else (address, port, 0, 0))
+        for addr_family, address in addresses
+        if family in (socket.AF_UNSPEC, addr_family)
+    ]
+    if not addrinfo:
+        # as getaddrinfo does for a name without an address of the requested family
+        raise socket.gaierror(socket.EAI_NONAME, f"Name or service not known: {host}")
+    return addrinfo
+
+class DnsCache:
+    """
+    Resolves hostnames for the probes and caches the answers for their record TTL,
+    so hosts that are checked over and over are not looked up every time.
+    Failed lookups are cached for negative_ttl seconds. When max_size hostnames are
+    cached the least recently used one is dropped.
+    Names in the hosts file, and every name when no resolver is configured, go
+    through getaddrinfo and are cached for HOSTS_TTL seconds.
+    Args
+        max_size - number of hostnames to keep
+        min_ttl, max_ttl - bounds applied to record TTLs, in seconds
+        negative_ttl - in seconds
+        timeout - in seconds
+    """
+    def __init__(self, max_size:int=DNS_CACHE_SIZE, min_ttl:float=DNS_MIN_TTL, max_ttl:float=DNS_MAX_TTL,
+                 negative_ttl:float=DNS_NEGATIVE_TTL, timeout:float=DNS_TIMEOUT):
+        self.max_size = max_size
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self.timeout = timeout
+        self.entries = OrderedDict() # host -> (expires_at, [(family, address)] or the gaierror)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.hosts = read_hosts_file()
+        self.resolver = None
+        try:
+            self.resolver = dns.resolver.Resolver()
+            self.resolver.lifetime = timeout
+        except dns.resolver.NoResolverConfiguration:
+            pass
+
+    def resolve(self, host:str, port:int, family:int=socket.AF_UNSPEC)->list[tuple]:
+        """
+        Resolve host like socket.getaddrinfo(host, port, family, socket.SOCK_STREAM).
+        Raises socket.gaierror when the host does not resolve.
+        """
+        if _is_address(host):
+            return socket.getaddrinfo(host, port, family, socket.SOCK_STREAM)
+        addresses = self.lookup(host)
+        if addresses is None:
+            addresses = self._resolve(host)
+        return _addrinfo(host, addresses, port, family)
+
+    def resolve_cached(self, host:str, port:int, family:int=socket.AF_UNSPEC)->Optional[list[tuple]]:
+        """
+        Like resolve, but answers from the cache only and never blocks on a lookup.
+        Response
+            list - as returned by resolve, None when host is not cached (not counted as a miss)
+        """
+        if _is_address(host):
+            return socket.getaddrinfo(host, port, family, socket.SOCK_STREAM)
+        addresses = self.lookup(host, count_miss=False)
+        if addresses is None:
+            return None
+        return _addrinfo(host, addresses, port, family)
+
+    def lookup(self, host:str, count_miss:bool=True)->Optional[list[tuple[int, str]]]:
+        """
+        Cached addresses of host, None on a miss.
+        Raises the cached socket.gaierror for a name that failed to resolve recently.
+        """
+        host = host.lower()
+        with self.lock:
+            entry = self.entries.get(host)
+            if entry is None or entry[0] <= time.monotonic():
+                if count_miss:
+                    self.misses += 1
+                return None
+            self.entries.move_to_end(host)
+            self.hits += 1
+        if isinstance(entry[1], socket.gaierror):
+            raise socket.gaierror(*entry[1].args)
+        return entry[1]
+
+    def stats(self)->dict:
+        with self.lock:
+            return {
+                "size": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def _resolve(self, host:str)->list[tuple[int, str]]:
+        host = host.lower()
+        try:
+            if self.resolver is None or host in self.hosts or host.endswith(".localhost"):
+                addresses, ttl = self._getaddrinfo(host), HOSTS_TTL
+            else:
+                addresses, ttl = self._query(host)
+        except socket.gaierror as e:
+            self._store(host, e, self.negative_ttl)
+            raise
+        self._store(host, addresses, min(max(ttl, self.min_ttl), self.max_ttl))
+        return addresses
+
+    def _query(self, host:str)->tuple[list[tuple[int, str]], float]:
+        addresses = []
+        ttls = []
+        # IPv4 first, most probes only have a route over IPv4
+        for family, rdtype in ((socket.AF_INET, "A"), (socket.AF_INET6, "AAAA")):
+            try:
+                answer = self.resolver.resolve(host, rdtype, search=True)
+            except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN) as e:
+                if family == socket.AF_INET and isinstance(e, dns.resolver.NXDOMAIN):
+                    raise socket.gaierror(socket.EAI_NONAME, f"Name or service not known: {host}") from e
+                continue
+            except dns.exception.Timeout as e:
+                raise socket.gaierror(socket.EAI_AGAIN, f"Timed out resolving {host}") from e
+            except dns.exception.DNSException as e:
+                raise socket.gaierror(socket.EAI_FAIL, f"Failed to resolve {host}: {e}") from e
+            addresses.extend((family, rdata.address) for rdata in answer)
+            ttls.append(answer.rrset.ttl)
+        if not addresses:
+            raise socket.gaierror(socket.EAI_NODATA, f"No address associated with hostname: {host}")
+        return addresses, min(ttls)
+
+    @staticmethod
+    def _getaddrinfo(host:str)->list[tuple[int, str]]:
+        addresses = []
+        for family, _, _, _, sockaddr in socket.getaddrinfo(host, None, socket.AF_UNSPEC, socket.SOCK_STREAM):
+            if (family, sockaddr[0]) not in addresses:
+                addresses.append((family, sockaddr[0]))
+        return addresses
+
+    def _store(self, host:str, addresses, ttl:float):
+        with self.lock:
+            self.entries[host] = (time.monotonic() + ttl, addresses)
+            self.entries.move_to_end(host)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+class CachingResolver(AbstractResolver):
+    """
+    aiohttp resolver backed by a DnsCache. Cache hits are answered on the event loop,
+    misses are resolved on the loop's default executor so they never block it.
+    """
+    def __init__(self, cache:Optional[DnsCache]=None):
+        self.cache = cache or dns_cache
+
+    async def resolve(self, host:str, port:int=0, family:int=socket.AF_INET)->list[dict]:
+        try:
+            addresses = self.cache.resolve_cached(host, port, family)
+            if addresses is None:
+                loop = asyncio.get_running_loop()
+                addresses = await loop.run_in_executor(None, self.cache.resolve, host, port, family)
+        except socket.gaierror as e:
+            # aiohttp maps OSError from the resolver to ClientConnectorDNSError
+            raise OSError(e.errno, e.strerror or str(e)) from e
+        return [
+            {
+                "hostname": host,
+                "host": sockaddr[0],
+                "port": port,
+                "family": addr_family,
+                "proto": proto,
+                "flags": socket.AI_NUMERICHOST | socket.AI_NUMERICSERV,
+            }
+            for addr_family, _, proto, _, sockaddr in addresses
+        ]
+
+    async def close(self):
+        pass
+
+dns_cache = DnsCache()
@@ -0,0 +1,188 @@
+from typing import Iterator, Optional
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from http.cookiejar import DefaultCookiePolicy
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NameResolutionError, ConnectTimeoutError, NewConnectionError
+from urllib3.util import connection
+import os
+import socket
+import threading
+import time
+import requests
+from .dns_cache import dns_cache
+
+POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", 100)) # hosts that keep a connection pool
+POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", 10)) # idle connections kept per host
+POOL_IDLE_TIMEOUT = float(os.getenv("HTTP_POOL_IDLE_TIMEOUT", 60)) # seconds before an unused host pool is closed
+# open a new connection for every probe, to measure cold-connect times
+FORCE_FRESH_CONNECTION = os.getenv("HTTP_FORCE_FRESH_CONNECTION", "false").lower() == "true"
+
+_probe = threading.local()
+
+class ProbeTimings:
+    """
+    Time spent, in milliseconds, setting up the connections of the probe running on this thread.
+    A phase stays None when a pooled connection was reused and the phase never ran.
+    """
+    def __init__(self):
+        self.dns_ms = None
+        self.connect_ms = None
+        self.tls_ms = None
+
+    def add(self, phase:str, elapsed_ns:int):
+        setattr(self, phase, (getattr(self, phase) or 0) + elapsed_ns / 1e6)
+
+    def setup_ms(self)->float:
+        return (self.dns_ms or 0) + (self.connect_ms or 0) + (self.tls_ms or 0)
+
+def start_probe_timings()->ProbeTimings:
+    """Start collecting connection timings for a probe on the current thread."""
+    _probe.timings = ProbeTimings()
+    return _probe.timings
+
+def _record(phase:str, elapsed_ns:int):
+    timings = getattr(_probe, "timings", None)
+    if timings is not None:
+        timings.add(phase, elapsed_ns)
+
+def resolve(host:str, port:int)->list[tuple]:
+    return dns_cache.resolve(host, port, connection.allowed_gai_family())
+
+class TimedConnectionMixin:
+    """
+    Splits opening a connection into DNS resolution, TCP connect and, for https,
+    the TLS handshake, and records each phase on the probe's ProbeTimings.
+    """
+    def _new_conn(self)->socket.socket:
+        start = time.perf_counter_ns()
+        try:
+            # urllib3 keeps IPv6 hosts in brackets, the resolver wants them bare
+            addresses = resolve(self.host.strip("[]"), self.port)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        resolved = time.perf_counter_ns()
+        _record("dns_ms", resolved - start)
+
+        error = None
+        for _, _, _, _, sockaddr in addresses:
+            try:
+                sock = connection.create_connection(
+                    sockaddr[:2],
+                    self.timeout,
+                    source_address=self.source_address,
+                    socket_options=self.socket_options,
+                )
+                break
+            except OSError as e:
+                error = e
+        else:
+            if isinstance(error, socket.timeout):
+                raise ConnectTimeoutError(
+                    self,
+                    f"Connection to {self.host} timed out. (connect timeout={self.timeout})",
+                ) from error
+            raise NewConnectionError(self, f"Failed to establish a new connection: {error}") from error
+
+        connected = time.perf_counter_ns()
+        _record("connect_ms", connected - resolved)
+        self._socket_ns = connected - start
+        return sock
+
+    def connect(self):
+        start = time.perf_counter_ns()
+        self._socket_ns = 0
+        super().connect()
+        if isinstance(self, HTTPSConnection):
+            _record("tls_ms", time.perf_counter_ns() - start - self._socket_ns)
+
+class TimedHTTPConnection(TimedConnectionMixin, HTTPConnection):
+    pass
+
+class TimedHTTPSConnection(TimedConnectionMixin, HTTPSConnection):
+    pass
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+class TimedHTTPAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+class HttpClient:
+    """
+    Keeps connections alive between probes, so a check against a host that was
+    checked recently skips the DNS lookup, TCP connect and TLS handshake.
+    The pools of hosts that go unused for idle_timeout seconds are closed.
+    Args
+        pool_connections - number of hosts to keep a pool for
+        pool_maxsize - number of connections to keep per host
+        idle_timeout - in seconds
+    """
+    def __init__(self, pool_connections:int=POOL_CONNECTIONS, pool_maxsize:int=POOL_MAXSIZE, idle_timeout:float=POOL_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self.adapter = TimedHTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session = self._new_session(self.adapter)
+        self.last_used = {}
+        self.last_sweep = time.monotonic()
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def get(self, url:str, timeout:Optional[float], fresh:bool=False)->Iterator[requests.Response]:
+        """
+        GET the url, following redirects. The body is not read yet, the caller reads
+        it from the response inside the with block, which closes the response on exit.
+        Args
+            fresh - use a new connection, closed after the response, instead of a pooled one
+        """
+        if fresh:
+            session = self._new_session(TimedHTTPAdapter(pool_connections=1, pool_maxsize=1))
+            try:
+                with session.get(url=url, timeout=timeout, allow_redirects=True, verify=True, stream=True, headers={"Connection": "close"}) as response:
+                    yield response
+            finally:
+                session.close()
+            return
+
+        now = time.monotonic()
+        parsed = urlparse(url)
+        with self.lock:
+            self.last_used[(parsed.scheme, parsed.hostname)] = now
+            if now - self.last_sweep >= min(self.idle_timeout, 10):
+                self.last_sweep = now
+                self._evict_idle(now)
+        with self.session.get(url=url, timeout=timeout, allow_redirects=True, verify=True, stream=True) as response:
+            yield response
+
+    def close(self):
+        self.session.close()
+
+    def _evict_idle(self, now:float):
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            host = (key.key_scheme, key.key_host)
+            # pools opened by redirects were never requested directly, start their clock now
+            last_used = self.last_used.setdefault(host, now)
+            if now - last_used >= self.idle_timeout:
+                pools.pop(key, None)
+                del self.last_used[host]
+
+    @staticmethod
+    def _new_session(adapter:HTTPAdapter)->requests.Session:
+        session = requests.Session()
+        # probes are independent, cookies set by one must not leak into the next
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+http_client = HttpClient()
@@ -0,0 +1,36 @@
+from prometheus_client import Counter, Histogram
+
+# Prometheus metrics shared by the API and the scheduler. Label children are bound
+# once here, so recording on the hot path is a single observe() without a label lookup.
+
+PROBE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+DB_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+PROBE_OUTCOMES = ("healthy", "unhealthy", "error")
+
+PROBE_DURATION = Histogram(
+    "thatworks_probe_duration_seconds",
+    "Wall time of health check probes, the rate of its _count is probes per second",
+    ["engine", "outcome"],
+    buckets=PROBE_BUCKETS,
+)
+# engine -> outcome -> child
+PROBE_DURATIONS = {
+    engine: {outcome: PROBE_DURATION.labels(engine, outcome) for outcome in PROBE_OUTCOMES}
+    for engine in ("sync", "async")
+}
+
+DB_WRITE_DURATION = Histogram(
+    "thatworks_db_write_duration_seconds",
+    "Time from the first statement to the commit of database writes",
+    ["operation"],
+    buckets=DB_BUCKETS,
+)
+RESULT_WRITE_DURATION = DB_WRITE_DURATION.labels("write_results")
+
+RESULTS_DROPPED = Counter(
+    "thatworks_results_dropped_total",
+    "Buffered results given up on after failed writes left more than max_buffer waiting",
+)
+
+def probe_outcome(result:dict)->str:
+    return "error" if result["error"] else result["status"]
@@ -0,0 +1,32 @@
+from typing import Optional
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from app.models import MonitoredUrl
+import json
+
+# schedulers LISTEN on this channel to pick up monitored url changes right away
+URL_CHANGES_CHANNEL = "monitored_url_changes"
+
+def notify_url_changed(session:Session, url:Optional[MonitoredUrl]=None, deleted_id:Optional[int]=None):
+    """
+    Queue a NOTIFY about a monitored url that was added, updated or deleted. Postgres
+    delivers it when the session commits, and drops it if the session rolls back.
+    Payload: {"id": ..., "deleted": bool, "is_active": bool, "next_check_at": ISO 8601 or null}
+    """
+    if url is not None:
+        payload = {
+            "id": url.id,
+            "deleted": False,
+            "is_active": url.is_active,
+            "next_check_at": url.next_check_at.isoformat() if url.next_check_at else None,
+        }
+    else:
+        payload = {"id": deleted_id, "deleted": True, "is_active": False, "next_check_at": None}
+    session.execute(select(func.pg_notify(URL_CHANGES_CHANNEL, json.dumps(payload))))
+
+def notify_urls_reloaded(session:Session):
+    """
+    Queue a NOTIFY telling schedulers to reload their schedule, after a bulk change
+    too large to send url by url. Payload: {"reload": true}
+    """
+    session.execute(select(func.pg_notify(URL_CHANGES_CHANNEL, json.dumps({"reload": True}))))
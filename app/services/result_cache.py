@@ -0,0 +1,48 @@
+from typing import Hashable, Optional
+from collections import OrderedDict
+import threading
+import time
+
+class ResultCache:
+    """
+    Keeps recent check results in memory for ttl seconds, so repeated checks of
+    the same url are answered without probing it again. When max_size results are
+    cached the least recently used one is dropped.
+    Args
+        ttl - in seconds
+        max_size - number of results to keep
+    """
+    def __init__(self, ttl:float=30, max_size:int=1000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = OrderedDict() # key -> (stored_at, result)
+        self.lock = threading.Lock()
+
+    def get(self, key:Hashable, max_age:Optional[float]=None)->Optional[tuple[dict, float]]:
+        """
+        Args
+            max_age - in seconds, results older than this are treated as missing (optional, defaults to ttl)
+        Response
+            tuple - a copy of the cached result and its age in seconds, None on a miss
+        """
+        max_age = self.ttl if max_age is None else min(max_age, self.ttl)
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            age = now - entry[0]
+            if age >= self.ttl:
+                del self.entries[key]
+                return None
+            if age >= max_age:
+                return None
+            self.entries.move_to_end(key)
+            return dict(entry[1]), age
+
+    def put(self, key:Hashable, result:dict):
+        with self.lock:
+            self.entries[key] = (time.monotonic(), dict(result))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
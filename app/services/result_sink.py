@@ -0,0 +1,244 @@
+from typing import Callable, Optional
+from datetime import datetime, timezone
+from sqlalchemy import insert, update, select, values, column, cast, tuple_, Integer, Float, Boolean, String, DateTime
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app.models import HealthCheck, MonitoredUrl, LatestCheck
+from .rollups import apply_rollups
+from .checker import TIMING_PHASES
+from .metrics import RESULT_WRITE_DURATION, RESULTS_DROPPED
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+def health_check_row(url:str, timeout_s:float, result:dict, checked_at:Optional[datetime]=None)->dict:
+    """
+    Build a health_checks row from a check_health result.
+    Args
+        url - The URL that was checked
+        timeout_s - the timeout the check ran with, in seconds
+        result - dict returned by check_health
+        checked_at - when the check ran (optional, defaults to now)
+    """
+    return {
+        "url": url,
+        "timeout_s": timeout_s,
+        "status_code": result.get("status_code"),
+        "is_healthy": True if result.get("status") == "healthy" else False,
+        "response_time_ms": result.get("response_time_ms"),
+        "error": result.get("error"),
+        **{phase: result.get(phase) for phase in TIMING_PHASES},
+        "created_at": checked_at or datetime.now(timezone.utc),
+    }
+
+def apply_latest(session:Session, rows:list[dict], ids:list[int]):
+    """
+    Upsert the newest of a batch of health_checks rows per url into latest_checks.
+    Only monitored urls are kept there, the results of on-demand checks of other urls are skipped.
+    """
+    latest = {}
+    for row, check_id in zip(rows, ids):
+        current = latest.get(row["url"])
+        if current is None or (row["created_at"], check_id) > (current["checked_at"], current["check_id"]):
+            latest[row["url"]] = {
+                "url": row["url"],
+                "check_id": check_id,
+                "status_code": row["status_code"],
+                "is_healthy": row["is_healthy"],
+                "response_time_ms": row["response_time_ms"],
+                "error": row["error"],
+                "checked_at": row["created_at"],
+            }
+    columns = ("url", "check_id", "status_code", "is_healthy", "response_time_ms", "error", "checked_at")
+    batch = values(
+        column("url", String),
+        column("check_id", Integer),
+        column("status_code", Integer),
+        column("is_healthy", Boolean),
+        column("response_time_ms", Float),
+        column("error", String),
+        column("checked_at", DateTime(timezone=True)),
+        name="batch",
+    ).data([tuple(row[name] for name in columns) for row in latest.values()])
+    monitored = (
+        # VALUES renders None as an untyped NULL, which makes a column of NULLs text
+        select(*(cast(value, value.type) for value in batch.c))
+        .where(batch.c.url.in_(select(MonitoredUrl.url)))
+        # a fixed order keeps concurrent writers from deadlocking on the same rows
+        .order_by(batch.c.url)
+    )
+    stmt = pg_insert(LatestCheck).from_select(columns, monitored)
+    excluded = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[LatestCheck.url],
+        set_={
+            "check_id": excluded.check_id,
+            "status_code": excluded.status_code,
+            "is_healthy": excluded.is_healthy,
+            "response_time_ms": excluded.response_time_ms,
+            "error": excluded.error,
+            "checked_at": excluded.checked_at,
+        },
+        # a batch that was written late must not overwrite a newer check
+        where=tuple_(LatestCheck.checked_at, LatestCheck.check_id) < tuple_(excluded.checked_at, excluded.check_id),
+    )
+    session.execute(stmt)
+
+def write_results(session:Session, rows:list[dict], schedule_updates:Optional[list[dict]]=None)->list[int]:
+    """
+    Persist a batch of results in one transaction.
+    Health checks go in as a single multi-row INSERT, their check_rollups buckets and
+    latest_checks rows are set with one upsert each and the monitored url scheduling
+    columns are set with a single UPDATE ... FROM (VALUES ...).
+    Args
+        rows - health_checks rows, see health_check_row
+        schedule_updates - dicts with id, next_check_at, last_checked_at and consecutive_failures
+    Response
+        list - ids of the inserted health checks, in the order of rows
+    """
+    start = time.perf_counter()
+    ids = []
+    if rows:
+        stmt = insert(HealthCheck).returning(HealthCheck.id, sort_by_parameter_order=True)
+        ids = session.execute(stmt, rows).scalars().all()
+        apply_rollups(session, rows)
+        apply_latest(session, rows, ids)
+    if schedule_updates:
+        schedule = values(
+            column("id", Integer),
+            column("next_check_at", DateTime(timezone=True)),
+            column("last_checked_at", DateTime(timezone=True)),
+            column("consecutive_failures", Integer),
+            name="schedule",
+        ).data([
+            (u["id"], u["next_check_at"], u["last_checked_at"], u["consecutive_failures"])
+            for u in schedule_updates
+        ])
+        stmt = (
+            update(MonitoredUrl)
+            .where(MonitoredUrl.id == schedule.c.id)
+            .values(
+                next_check_at=schedule.c.next_check_at,
+                last_checked_at=schedule.c.last_checked_at,
+                consecutive_failures=schedule.c.consecutive_failures,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        session.execute(stmt)
+    session.commit()
+    RESULT_WRITE_DURATION.observe(time.perf_counter() - start)
+    return ids
+
+class ResultSink:
+    """
+    Buffers health check results in memory and writes them with write_results.
+    The buffer is flushed once it holds max_batch results, every flush_interval seconds,
+    on flush() and on close(). add() blocks while max_buffer results are waiting, so a
+    slow database pushes back on the producers instead of growing the buffer.
+    A batch that fails to write goes back to the front of the buffer and is retried by
+    the next flush. Only when that leaves more than max_buffer results waiting are the
+    oldest dropped, and counted in dropped.
+    Args
+        session_factory - callable returning a new Session
+        max_batch - number of buffered results that triggers a flush
+        flush_interval - maximum seconds a result waits in the buffer
+        max_buffer - maximum number of buffered results
+    """
+    def __init__(self, session_factory:Callable[[], Session], max_batch:int=500, flush_interval:float=1.0, max_buffer:int=10000):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.closed = False
+        self.dropped = 0
+        self._start_flusher()
+        # threads do not survive a fork, so a sink created before one (gunicorn's
+        # preload_app) gets a fresh flusher in the child
+        os.register_at_fork(after_in_child=self._start_flusher)
+
+    def _start_flusher(self):
+        self.rows = []
+        self.schedule_updates = []
+        self.buffer_changed = threading.Condition()
+        # serialises writes, so flush() returns only after earlier batches are committed
+        self.write_lock = threading.Lock()
+        self.flusher = threading.Thread(target=self._run, name="result-sink", daemon=True)
+        self.flusher.start()
+
+    def add(self, row:dict, schedule_update:Optional[dict]=None):
+        with self.buffer_changed:
+            while len(self.rows) >= self.max_buffer and not self.closed:
+                self.buffer_changed.wait()
+            if self.closed:
+                raise RuntimeError("Result sink is closed")
+            self.rows.append(row)
+            if schedule_update is not None:
+                self.schedule_updates.append(schedule_update)
+            if len(self.rows) >= self.max_batch:
+                self.buffer_changed.notify_all()
+
+    def flush(self)->bool:
+        """Write what is buffered, returns False when the write failed and the batch was put back."""
+        with self.write_lock:
+            with self.buffer_changed:
+                rows, self.rows = self.rows, []
+                schedule_updates, self.schedule_updates = self.schedule_updates, []
+                self.buffer_changed.notify_all()
+            if not rows and not schedule_updates:
+                return True
+            # a url checked again after a failed write has a newer schedule, which must win
+            schedule_updates = list({update["id"]: update for update in schedule_updates}.values())
+            session = self.session_factory()
+            try:
+                write_results(session, rows, schedule_updates)
+                return True
+            except Exception as e:
+                session.rollback()
+                logger.error(f"Failed to write {len(rows)} results, retrying with the next flush: {str(e)}")
+                self._requeue(rows, schedule_updates)
+                return False
+            finally:
+                session.close()
+
+    def _requeue(self, rows:list[dict], schedule_updates:list[dict]):
+        with self.buffer_changed:
+            self.rows = rows + self.rows
+            self.schedule_updates = schedule_updates + self.schedule_updates
+            overflow = len(self.rows) - self.max_buffer
+            if overflow > 0:
+                del self.rows[:overflow]
+                self.dropped += overflow
+                RESULTS_DROPPED.inc(overflow)
+                logger.error(f"Dropped the {overflow} oldest results, the buffer is full")
+            del self.schedule_updates[:max(len(self.schedule_updates) - self.max_buffer, 0)]
+
+    def close(self):
+        """Stop the background flusher and drain whatever is still buffered."""
+        with self.buffer_changed:
+            if self.closed:
+                return
+            self.closed = True
+            self.buffer_changed.notify_all()
+        self.flusher.join()
+        if not self.flush():
+            dropped = len(self.rows)
+            self.dropped += dropped
+            RESULTS_DROPPED.inc(dropped)
+            logger.error(f"Dropped {dropped} results that could not be written before closing")
+
+    def _run(self):
+        failed = False
+        while True:
+            with self.buffer_changed:
+                # the condition is also notified when flush() empties the buffer, so wait
+                # until the interval is over or a batch is full, a retry after a failed
+                # write always waits the whole interval
+                flush_at = time.monotonic() + self.flush_interval
+                while not self.closed and time.monotonic() < flush_at and (failed or len(self.rows) < self.max_batch):
+                    self.buffer_changed.wait(timeout=flush_at - time.monotonic())
+                if self.closed:
+                    return
+            failed = not self.flush()
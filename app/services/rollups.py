@@ -0,0 +1,155 @@
+from datetime import datetime, timezone
+from bisect import bisect_left
+from typing import Optional
+from sqlalchemy import func, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app.models import CheckRollup
+from .checker import TIMING_PHASES
+
+GRANULARITIES = ("minute", "hour", "day")
+
+# Upper bounds of the latency histogram buckets, in milliseconds.
+# A response time goes in the first bucket whose bound it does not exceed,
+# anything slower than the last bound goes in an extra overflow bucket.
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 75, 100, 150, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000, 30000)
+
+def bucket_start(ts:datetime, granularity:str)->datetime:
+    ts = ts.astimezone(timezone.utc)
+    if granularity == "minute":
+        return ts.replace(second=0, microsecond=0)
+    if granularity == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def build_rollups(rows:list[dict])->list[dict]:
+    """
+    Aggregate health_checks rows into one check_rollups row per url, granularity and bucket.
+    Rows without created_at are counted as checked now.
+    """
+    rollups = {}
+    now = datetime.now(timezone.utc)
+    for row in rows:
+        checked_at = row.get("created_at") or now
+        response_time = row.get("response_time_ms")
+        for granularity in GRANULARITIES:
+            key = (row["url"], granularity, bucket_start(checked_at, granularity))
+            rollup = rollups.get(key)
+            if rollup is None:
+                rollup = rollups[key] = {
+                    "url": key[0],
+                    "granularity": key[1],
+                    "bucket_start": key[2],
+                    "total_count": 0,
+                    "healthy_count": 0,
+                    "response_time_count": 0,
+                    "response_time_sum": 0.0,
+                    "response_time_min": None,
+                    "response_time_max": None,
+                    "latency_histogram": [0] * (len(LATENCY_BUCKETS_MS) + 1),
+                    **{f"{phase}_sum": 0.0 for phase in TIMING_PHASES},
+                    **{f"{phase}_count": 0 for phase in TIMING_PHASES},
+                }
+            rollup["total_count"] += 1
+            if row.get("is_healthy"):
+                rollup["healthy_count"] += 1
+            if response_time is not None:
+                rollup["response_time_count"] += 1
+                rollup["response_time_sum"] += response_time
+                if rollup["response_time_min"] is None or response_time < rollup["response_time_min"]:
+                    rollup["response_time_min"] = response_time
+                if rollup["response_time_max"] is None or response_time > rollup["response_time_max"]:
+                    rollup["response_time_max"] = response_time
+                rollup["latency_histogram"][bisect_left(LATENCY_BUCKETS_MS, response_time)] += 1
+            for phase in TIMING_PHASES:
+                if row.get(phase) is not None:
+                    rollup[f"{phase}_sum"] += row[phase]
+                    rollup[f"{phase}_count"] += 1
+    # a fixed order keeps concurrent writers from deadlocking on the same rollup rows
+    return [rollups[key] for key in sorted(rollups)]
+
+def apply_rollups(session:Session, rows:list[dict]):
+    """Fold a batch of health_checks rows into check_rollups with a single upsert."""
+    rollups = build_rollups(rows)
+    if not rollups:
+        return
+    stmt = pg_insert(CheckRollup).values(rollups)
+    excluded = stmt.excluded
+    phase_totals = {}
+    for phase in TIMING_PHASES:
+        for column in (f"{phase}_sum", f"{phase}_count"):
+            phase_totals[column] = getattr(CheckRollup, column) + excluded[column]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CheckRollup.url, CheckRollup.granularity, CheckRollup.bucket_start],
+        set_={
+            "total_count": CheckRollup.total_count + excluded.total_count,
+            "healthy_count": CheckRollup.healthy_count + excluded.healthy_count,
+            "response_time_count": CheckRollup.response_time_count + excluded.response_time_count,
+            "response_time_sum": CheckRollup.response_time_sum + excluded.response_time_sum,
+            "response_time_min": func.least(CheckRollup.response_time_min, excluded.response_time_min),
+            "response_time_max": func.greatest(CheckRollup.response_time_max, excluded.response_time_max),
+            **phase_totals,
+            "latency_histogram": literal_column(
+                "ARRAY(SELECT a + b FROM unnest(check_rollups.latency_histogram, excluded.latency_histogram) AS t(a, b))"
+            ),
+        },
+    )
+    session.execute(stmt)
+
+def percentile(histogram:list[int], q:float, low:Optional[float]=None, high:Optional[float]=None)->Optional[float]:
+    """
+    Estimate the q-th percentile (0-100) from a latency histogram.
+    The value is interpolated linearly inside its bucket and kept within [low, high],
+    the observed minimum and maximum, when they are given.
+    """
+    total = sum(histogram)
+    if total == 0:
+        return None
+    rank = q / 100 * total
+    seen = 0
+    for i, count in enumerate(histogram):
+        if count and seen + count >= rank:
+            lower = LATENCY_BUCKETS_MS[i - 1] if i > 0 else 0.0
+            upper = LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else (high if high is not None else lower)
+            value = lower + (upper - lower) * (rank - seen) / count
+            if low is not None:
+                value = max(value, low)
+            if high is not None:
+                value = min(value, high)
+            return value
+        seen += count
+    return high
+
+def summarize(rollups:list[CheckRollup])->dict:
+    """Merge rollup rows into uptime and latency figures."""
+    total = sum(r.total_count for r in rollups)
+    healthy = sum(r.healthy_count for r in rollups)
+    timed = sum(r.response_time_count for r in rollups)
+    histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+    for r in rollups:
+        for i, count in enumerate(r.latency_histogram):
+            histogram[i] += count
+    mins = [r.response_time_min for r in rollups if r.response_time_min is not None]
+    maxs = [r.response_time_max for r in rollups if r.response_time_max is not None]
+    low = min(mins) if mins else None
+    high = max(maxs) if maxs else None
+    return {
+        "checks": total,
+        "healthy": healthy,
+        "uptime_pct": healthy * 100 / total if total else None,
+        "avg_response_time_ms": sum(r.response_time_sum for r in rollups) / timed if timed else None,
+        "min_response_time_ms": low,
+        "max_response_time_ms": high,
+        "p50_ms": percentile(histogram, 50, low, high),
+        "p95_ms": percentile(histogram, 95, low, high),
+        "p99_ms": percentile(histogram, 99, low, high),
+        "phases": phase_averages(rollups),
+    }
+
+def phase_averages(rollups:list[CheckRollup])->dict:
+    """Average of every timing phase, None for a phase that never ran."""
+    averages = {}
+    for phase in TIMING_PHASES:
+        count = sum(getattr(r, f"{phase}_count") for r in rollups)
+        averages[f"avg_{phase}"] = sum(getattr(r, f"{phase}_sum") for r in rollups) / count if count else None
+    return averages
@@ -0,0 +1,122 @@
+from typing import Callable, Hashable, Optional
+from concurrent.futures import Future
+from urllib.parse import urlparse
+import os
+import threading
+import time
+
+HOST_RATE_LIMIT = float(os.getenv("HOST_RATE_LIMIT", 5)) # probes per second per host, 0 disables the limit
+HOST_RATE_BURST = int(os.getenv("HOST_RATE_BURST", 10)) # probes a host can get back to back
+COALESCE_WINDOW = float(os.getenv("COALESCE_WINDOW", 1.0)) # seconds a finished probe's result is shared
+
+def url_host(url:str)->str:
+    return (urlparse(url).hostname or "").lower()
+
+class HostRateLimiter:
+    """
+    Token bucket per host: each host gets rate probes per second on average and
+    at most burst probes back to back. Thread safe, and shared by the sync and
+    async engines, so callers on either side wait for the same tokens.
+    Args
+        rate - tokens added per second, 0 disables the limit
+        burst - bucket size
+        max_hosts - buckets kept before the full ones are dropped
+    """
+    def __init__(self, rate:float=HOST_RATE_LIMIT, burst:int=HOST_RATE_BURST, max_hosts:int=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_hosts = max_hosts
+        self.buckets = {} # host -> [tokens, updated_at]
+        self.lock = threading.Lock()
+
+    def reserve(self, host:str)->float:
+        """
+        Take a token for host.
+        Response
+            float - seconds the caller has to wait before probing
+        """
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                if len(self.buckets) >= self.max_hosts:
+                    self._drop_full(now)
+                bucket = self.buckets[host] = [float(self.burst), now]
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            # the token is taken even when none is left, so waiters queue up in order
+            bucket[0] = tokens - 1
+            bucket[1] = now
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    def acquire(self, host:str):
+        """Block until host may be probed."""
+        delay = self.reserve(host)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _drop_full(self, now:float):
+        for host, (tokens, updated_at) in list(self.buckets.items()):
+            if tokens + (now - updated_at) * self.rate >= self.burst:
+                del self.buckets[host]
+
+class SingleFlight:
+    """
+    Runs one call per key at a time. Callers that ask for a key while its call is
+    in flight, or up to window seconds after it finished, get the same result.
+    Args
+        window - in seconds, 0 shares in-flight calls only
+    """
+    def __init__(self, window:float=COALESCE_WINDOW):
+        self.window = window
+        self.flights = {} # key -> (Future, finished_at or None)
+        self.last_sweep = time.monotonic()
+        self.lock = threading.Lock()
+
+    def do(self, key:Hashable, fn:Callable[[], object], max_age:Optional[float]=None)->tuple[object, bool]:
+        """
+        Args
+            max_age - in seconds, only share a finished call's result when it is
+                      younger than this (optional, defaults to window)
+        Response
+            tuple - the result of fn, and whether it came from another caller's call
+        """
+        window = self.window if max_age is None else min(max_age, self.window)
+        now = time.monotonic()
+        with self.lock:
+            flight = self.flights.get(key)
+            if flight is not None and (flight[1] is None or now - flight[1] < window):
+                future, shared = flight[0], True
+            else:
+                self._drop_finished(now)
+                future, shared = Future(), False
+                self.flights[key] = (future, None)
+        if shared:
+            return future.result(), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            with self.lock:
+                self.flights.pop(key, None)
+            future.set_exception(e)
+            raise
+        future.set_result(result)
+        with self.lock:
+            if self.window > 0:
+                self.flights[key] = (future, time.monotonic())
+            else:
+                self.flights.pop(key, None)
+        return result, False
+
+    def _drop_finished(self, now:float):
+        if now - self.last_sweep < max(self.window, 1):
+            return
+        self.last_sweep = now
+        for key, (_, finished_at) in list(self.flights.items()):
+            if finished_at is not None and now - finished_at >= self.window:
+                del self.flights[key]
+
+host_limiter = HostRateLimiter()
+probe_flights = SingleFlight()
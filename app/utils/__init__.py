@@ -1,3 +1,4 @@
-from .validators import validate_url, validate_timeout
+from .validators import validate_url, validate_timeout, validate_check_interval, validate_limit, validate_hours
+from .scheduling import next_slot, next_check_time, backoff_with_jitter
 
-__all__ = ['validate_url', 'validate_timeout']
+__all__ = ['validate_url', 'validate_timeout', 'validate_check_interval', 'validate_limit', 'validate_hours', 'next_slot', 'next_check_time', 'backoff_with_jitter']
@@ -0,0 +1,38 @@
+from datetime import datetime, timezone, timedelta
+import hashlib
+import math
+
+def hash_fraction(*parts)->float:
+    """A stable number in [0, 1) for the given values, the same in every process."""
+    digest = hashlib.blake2b("|".join(str(part) for part in parts).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2**64
+
+def slot_offset(url:str, interval_s:float)->float:
+    """Seconds into each interval at which the url is checked."""
+    return hash_fraction(url) * interval_s
+
+def next_slot(url:str, interval_s:float, after:datetime)->datetime:
+    """
+    First check time of the url after the given time.
+    Every url is checked at its own fixed offset into the interval, so urls that
+    share an interval are spread evenly across it instead of firing together.
+    """
+    offset = slot_offset(url, interval_s)
+    elapsed = after.astimezone(timezone.utc).timestamp() - offset
+    slot = (math.floor(elapsed / interval_s) + 1) * interval_s + offset
+    return datetime.fromtimestamp(slot, timezone.utc)
+
+def next_check_time(url:str, interval_s:float, now:datetime)->datetime:
+    """
+    The slot following a check that ran now. At least half an interval away, so a
+    check that ran late, or off its slot, is not followed by another right away.
+    """
+    return next_slot(url, interval_s, now + timedelta(seconds=interval_s / 2))
+
+def backoff_with_jitter(url:str, base_s:float, consecutive_failures:int, jitter:float)->float:
+    """
+    Spread a backoff of base_s seconds by up to +/- jitter (a fraction of it), so urls
+    that started failing together do not retry together. The spread is derived from
+    the url and the failure count, so it is the same on every scheduler.
+    """
+    return base_s * (1 + jitter * (2 * hash_fraction(url, consecutive_failures) - 1))
@@ -1,6 +1,10 @@
 from typing import Tuple
 from urllib.parse import urlparse
 
+MIN_INTERVAL_SECONDS = 60 # 1 minute
+MAX_INTERVAL_SECONDS = 3600 # 1 hour
+MAX_HISTORY_HOURS = 24 * 3650 # 10 years, further back than any partition is kept
+
 def validate_url(url:str)->Tuple[bool, str|None]:
     
     if url == "":
@@ -30,4 +34,37 @@ def validate_timeout(timeout:[int|float])->Tuple[bool, str|None]:
     if timeout < 0 or timeout > 30:
         return False, "Timeout must be between 0 and 30 seconds"
 
-    return True, None  
+    return True, None
+
+def validate_check_interval(check_interval:[int|float])->Tuple[bool, str|None]:
+
+    if check_interval == "":
+        return False, "Missing required field: 'check_interval'"
+
+    if not isinstance(check_interval, (int, float)):
+        return False, "Invalid check_interval format"
+
+    if check_interval < MIN_INTERVAL_SECONDS or check_interval > MAX_INTERVAL_SECONDS:
+        return False, f"Check interval must be between {MIN_INTERVAL_SECONDS} and {MAX_INTERVAL_SECONDS}"
+
+    return True, None
+
+def validate_limit(limit:str)->Tuple[bool, str|None]:
+
+    try:
+        if int(limit) < 1:
+            return False, "limit must be a positive integer"
+    except ValueError:
+        return False, "limit must be a positive integer"
+
+    return True, None
+
+def validate_hours(hours:str)->Tuple[bool, str|None]:
+
+    try:
+        if int(hours) < 1 or int(hours) > MAX_HISTORY_HOURS:
+            return False, f"hours must be an integer between 1 and {MAX_HISTORY_HOURS}"
+    except ValueError:
+        return False, f"hours must be an integer between 1 and {MAX_HISTORY_HOURS}"
+
+    return True, None
@@ -4,6 +4,19 @@ echo "Running migrations.."
 
 alembic upgrade head
 
-echo "Starting Flask dev server"
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+    # metrics of workers from a previous run must not be counted again, the
+    # directory has to exist before either server starts writing to it
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
 
-exec python -m flask run --host=0.0.0.0 --port=5000
+# SERVER_MODE=gunicorn (default) serves the API with the settings in gunicorn.conf.py,
+# SERVER_MODE=dev runs the single-process Flask dev server
+if [ "${SERVER_MODE:-gunicorn}" = "dev" ]; then
+    echo "Starting Flask dev server"
+    exec python -m flask run --host=0.0.0.0 --port=5000
+fi
+
+echo "Starting gunicorn"
+exec gunicorn --config gunicorn.conf.py
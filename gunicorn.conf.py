@@ -0,0 +1,36 @@
+import multiprocessing
+import os
+
+# gunicorn reads this file from the working directory, see entrypoint.sh.
+# gthread workers: every worker process serves GUNICORN_THREADS requests at once, so
+# a slow /api/v1/check probe ties up one thread instead of the whole server.
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+worker_class = "gthread"
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2))
+threads = int(os.getenv("GUNICORN_THREADS", 8))
+# seconds a worker may go without reporting back, must exceed the longest probe timeout
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 60))
+# seconds in-flight requests get to finish on HUP, TERM and worker recycling
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+# recycle workers after this many requests, spread so they do not all restart at once, 0 never
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 10000))
+max_requests_jitter = max_requests // 10
+# import the app once in the master and fork the workers from it. Workers start faster
+# and share memory, but a HUP then restarts them on the code the master loaded
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+wsgi_app = "app.main:create_app()"
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", None)
+errorlog = "-"
+
+def post_fork(server, worker):
+    # connections opened in the master must not be shared by the forked workers
+    from app.db import get_engine
+    engine = get_engine()
+    if engine is not None:
+        engine.dispose(close=False)
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
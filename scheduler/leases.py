@@ -0,0 +1,95 @@
+from typing import Callable
+from datetime import datetime, timezone, timedelta
+from sqlalchemy import update, delete
+from sqlalchemy.orm import Session
+import threading
+import logging
+
+from app.models import SchedulerLock
+from .metrics import LockMetrics
+
+logger = logging.getLogger(__name__)
+
+class LeaseKeeper:
+    """
+    Renews the leases this scheduler holds every interval seconds, so a slow batch
+    (long probe timeouts, a slow commit) does not outlive its LOCK_TIMEOUT and get
+    its urls claimed by another scheduler while they are still being checked.
+    Args
+        instance_id - this scheduler's id, the locked_by of its leases
+        session_factory - callable returning a new Session
+        lock_timeout - seconds a renewed lease is extended by
+        interval - seconds between renewals
+        metrics - LockMetrics to count renewals and lost leases on
+    Renewals run in the background once start() is called.
+    """
+    def __init__(self, instance_id:str, session_factory:Callable[[], Session], lock_timeout:float,
+                 interval:float, metrics:LockMetrics):
+        self.instance_id = instance_id
+        self.session_factory = session_factory
+        self.lock_timeout = lock_timeout
+        self.interval = interval
+        self.metrics = metrics
+        self.held = set()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name=f"{self.instance_id}-leases", daemon=True)
+        self.thread.start()
+
+    def hold(self, url_ids:list[int]):
+        with self.lock:
+            self.held.update(url_ids)
+
+    def release(self, url_ids:list[int]):
+        with self.lock:
+            self.held.difference_update(url_ids)
+
+    def renew(self):
+        with self.lock:
+            url_ids = list(self.held)
+        if not url_ids:
+            return
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.lock_timeout)
+        stmt = (
+            update(SchedulerLock)
+            .where(SchedulerLock.monitored_url_id.in_(url_ids))
+            .where(SchedulerLock.locked_by == self.instance_id)
+            .values(expires_at=expires_at)
+            .execution_options(synchronize_session=False)
+        )
+        with self.session_factory() as session:
+            renewed = session.execute(stmt).rowcount
+            session.commit()
+        self.metrics.incr("renewed", renewed)
+        if renewed < len(url_ids):
+            # released in the meantime, or expired and taken over by another scheduler
+            with self.lock:
+                lost = len(self.held.intersection(url_ids)) - renewed
+            if lost > 0:
+                self.metrics.incr("lost", lost)
+                logger.warning(f"{lost} leases of {self.instance_id} expired before they could be renewed")
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.renew()
+            except Exception as e:
+                logger.error(f"Lease renewal failed: {str(e)}")
+
+def sweep_expired_locks(session:Session)->int:
+    """
+    Bulk delete expired leases, the ones left behind by crashed schedulers, with a
+    range scan on idx_expires_at. Returns the number of leases removed.
+    """
+    stmt = delete(SchedulerLock).where(SchedulerLock.expires_at < datetime.now(timezone.utc))
+    swept = session.execute(stmt).rowcount
+    session.commit()
+    return swept
@@ -0,0 +1,73 @@
+from typing import Callable
+from sqlalchemy.engine import Engine
+import json
+import select
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ChangeListener:
+    """
+    LISTENs on a channel on a dedicated connection and hands every notification's
+    JSON payload to on_notify. Notifications sent while the connection was down are
+    lost, so on_reconnect is called after every (re)connect to resync from the table.
+    Args
+        engine - the scheduler's engine, the connection is taken out of its pool
+        channel - channel to LISTEN on
+        on_notify - called with the decoded payload of each notification
+        on_reconnect - called once the LISTEN is in place again
+        retry_interval - seconds to wait before reconnecting
+    """
+    def __init__(self, engine:Engine, channel:str, on_notify:Callable[[dict], None],
+                 on_reconnect:Callable[[], None], retry_interval:float=5):
+        self.engine = engine
+        self.channel = channel
+        self.on_notify = on_notify
+        self.on_reconnect = on_reconnect
+        self.retry_interval = retry_interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="change-listener", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def _run(self):
+        connected_before = False
+        while not self.stopped.is_set():
+            connection = None
+            try:
+                connection = self.engine.raw_connection()
+                dbapi_connection = connection.driver_connection
+                dbapi_connection.autocommit = True
+                with dbapi_connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.channel}"')
+                logger.info(f"Listening for {self.channel}")
+                if connected_before:
+                    self.on_reconnect()
+                connected_before = True
+                self._listen(dbapi_connection)
+            except Exception as e:
+                logger.error(f"Listening for {self.channel} failed: {str(e)}")
+                self.stopped.wait(self.retry_interval)
+            finally:
+                if connection is not None:
+                    # never hand a LISTENing connection back to the pool
+                    connection.invalidate()
+
+    def _listen(self, dbapi_connection):
+        while not self.stopped.is_set():
+            # wake up now and then to notice stop()
+            if select.select([dbapi_connection], [], [], 1.0) == ([], [], []):
+                continue
+            dbapi_connection.poll()
+            while dbapi_connection.notifies:
+                notification = dbapi_connection.notifies.pop(0)
+                try:
+                    self.on_notify(json.loads(notification.payload))
+                except Exception as e:
+                    logger.error(f"Bad {self.channel} notification {notification.payload!r}: {str(e)}")
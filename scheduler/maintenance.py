@@ -0,0 +1,169 @@
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection, Engine
+from datetime import datetime, timezone, timedelta
+import logging
+
+from .config import config
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "health_checks"
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+# pg advisory lock key, so only one scheduler replica runs maintenance at a time
+MAINTENANCE_LOCK_ID = 724_001
+
+def partition_name(day:datetime)->str:
+    return f"{PARENT_TABLE}_p{day:%Y%m%d}"
+
+def list_partitions(conn:Connection)->list[tuple[str, datetime|None]]:
+    """
+    Return (name, upper bound) for every partition of health_checks.
+    The upper bound is None for the default partition.
+    """
+    rows = conn.execute(text("""
+        SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = :parent
+    """), {"parent": PARENT_TABLE})
+    partitions = []
+    for name, bound in rows:
+        # e.g. FOR VALUES FROM ('2026-10-18 00:00:00+00') TO ('2026-10-19 00:00:00+00')
+        upper = None
+        if " TO ('" in bound:
+            upper = datetime.fromisoformat(bound.split(" TO ('")[1].split("'")[0])
+        partitions.append((name, upper))
+    return partitions
+
+def create_partitions(conn:Connection, days_ahead:int)->list[str]:
+    """
+    Create the daily partitions from the end of the existing ones up to days_ahead days
+    from now. Days missed while maintenance was not running are created too.
+    """
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    bounds = [upper for _, upper in list_partitions(conn) if upper is not None]
+    start = max(bounds, default=today).astimezone(timezone.utc)
+    created = []
+    while start <= today + timedelta(days=days_ahead):
+        end = start + timedelta(days=1)
+        created.append(create_partition(conn, start, end))
+        start = end
+    return created
+
+def create_partition(conn:Connection, start:datetime, end:datetime)->str:
+    """
+    Create the partition for [start, end). Rows of that range that landed in the default
+    partition meanwhile would make CREATE TABLE ... PARTITION OF fail, so they are moved
+    into the new table before it is attached.
+    """
+    name = partition_name(start)
+    bound = f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    in_range = {"start": start, "end": end}
+    stray = conn.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end)"),
+        in_range,
+    ).scalar()
+    if not stray:
+        conn.execute(text(f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} {bound}"))
+        return name
+
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    moved = conn.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+    """), in_range).rowcount
+    # the parent's indexes are built on the table as it is attached
+    conn.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} {bound}"))
+    logger.info(f"Moved {moved} rows from {DEFAULT_PARTITION} into {name}")
+    return name
+
+def drop_expired_partitions(conn:Connection, retention_days:int)->list[str]:
+    """Drop every partition that only holds rows older than retention_days."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    dropped = []
+    for name, upper in list_partitions(conn):
+        if upper is not None and upper <= cutoff:
+            conn.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    return dropped
+
+def prune_default_partition(conn:Connection, retention_days:int)->int:
+    """Rows that landed in the default partition are kept as long as the daily partitions."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    result = conn.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE created_at < :cutoff"), {"cutoff": cutoff})
+    return result.rowcount
+
+def prune_rollups(conn:Connection, granularity:str, retention_days:int)->int:
+    """
+    Minute rollups are kept for recent history and hour rollups for longer. Day rollups
+    are kept forever, they are one row per url a day and the only history left once the
+    raw partitions are dropped.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    result = conn.execute(
+        text("DELETE FROM check_rollups WHERE granularity = :granularity AND bucket_start < :cutoff"),
+        {"granularity": granularity, "cutoff": cutoff},
+    )
+    return result.rowcount
+
+def prune_check_jobs(conn:Connection, retention_hours:int)->int:
+    """Jobs of /api/v1/check/async are only polled for shortly after they ran, their checks stay in health_checks."""
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=retention_hours)
+    result = conn.execute(text("DELETE FROM check_jobs WHERE created_at < :cutoff"), {"cutoff": cutoff})
+    return result.rowcount
+
+def prune_latest_checks(conn:Connection)->int:
+    """Urls are deleted along with their latest_checks row, this catches a result written while one was being deleted."""
+    result = conn.execute(text("""
+        DELETE FROM latest_checks l
+        WHERE NOT EXISTS (SELECT 1 FROM monitored_urls m WHERE m.url = l.url)
+    """))
+    return result.rowcount
+
+def run_maintenance(engine:Engine):
+    """
+    Run every maintenance step in a transaction of its own, so a step that fails is
+    retried on the next run without holding back the others.
+    """
+    steps = [
+        ("created", lambda conn: create_partitions(conn, config.PARTITION_PREMAKE_DAYS)),
+        ("dropped", lambda conn: drop_expired_partitions(conn, config.PARTITION_RETENTION_DAYS)),
+        ("pruned default rows", lambda conn: prune_default_partition(conn, config.PARTITION_RETENTION_DAYS)),
+        ("pruned minute rollups", lambda conn: prune_rollups(conn, "minute", config.ROLLUP_MINUTE_RETENTION_DAYS)),
+        ("pruned hour rollups", lambda conn: prune_rollups(conn, "hour", config.ROLLUP_HOUR_RETENTION_DAYS)),
+        ("pruned check jobs", lambda conn: prune_check_jobs(conn, config.CHECK_JOB_RETENTION_HOURS)),
+        ("pruned orphaned latest checks", prune_latest_checks),
+    ]
+    with engine.connect() as conn:
+        locked = conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": MAINTENANCE_LOCK_ID}).scalar()
+        conn.commit()
+        if not locked:
+            logger.info("Partition maintenance is already running elsewhere")
+            return
+        done = {}
+        try:
+            for step, run in steps:
+                try:
+                    with conn.begin():
+                        done[step] = run(conn)
+                except Exception as e:
+                    logger.error(f"Partition maintenance step '{step}' failed: {str(e)}")
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MAINTENANCE_LOCK_ID})
+            conn.commit()
+    logger.info(f"Partition maintenance {', '.join(f'{step} {result}' for step, result in done.items())}")
+
+def main():
+    engine = create_engine(config.DATABASE_URL)
+    try:
+        run_maintenance(engine)
+    finally:
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
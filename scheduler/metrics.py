@@ -0,0 +1,86 @@
+from collections import deque
+from prometheus_client import Counter, Histogram
+from app.services.metrics import DB_WRITE_DURATION
+import threading
+
+# exported on METRICS_PORT, children are bound once so the scheduling loop only observes
+SCHEDULING_LAG = Histogram(
+    "thatworks_scheduling_lag_seconds",
+    "How long after its next_check_at each probe started",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+CLAIM_BATCH_SIZE = Histogram(
+    "thatworks_claim_batch_size",
+    "Urls leased by one claim",
+    buckets=(0, 1, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+LEASE_EVENTS = Counter("thatworks_lease_events_total", "Lease events, see LockMetrics", ["event"])
+CLAIM_DURATION = DB_WRITE_DURATION.labels("claim")
+RELEASE_DURATION = DB_WRITE_DURATION.labels("release")
+
+class LagTracker:
+    """
+    Scheduling lag, in seconds, of the most recent probes: how long after its
+    next_check_at each probe actually started.
+    Args
+        window - number of recent probes the percentiles are computed over
+    """
+    def __init__(self, window:int=10000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, lag_s:float):
+        lag_s = max(lag_s, 0.0)
+        with self.lock:
+            self.samples.append(lag_s)
+            self.count += 1
+            self.total += lag_s
+            self.max = max(self.max, lag_s)
+        SCHEDULING_LAG.observe(lag_s)
+
+    def snapshot(self)->dict:
+        with self.lock:
+            samples = sorted(self.samples)
+            count, total, highest = self.count, self.total, self.max
+
+        def quantile(q):
+            return samples[min(int(q * len(samples)), len(samples) - 1)] if samples else None
+
+        return {
+            "count": count,
+            "avg_s": total / count if count else None,
+            "max_s": highest if count else None,
+            "p50_s": quantile(0.5),
+            "p99_s": quantile(0.99),
+        }
+
+class LockMetrics:
+    """
+    Lease counters since the scheduler started:
+        acquired - leases taken on due urls
+        reclaimed - acquired leases that took over an expired one
+        contended - due urls in the schedule that could not be claimed, leased or taken by another scheduler
+        renewed - lease renewals
+        lost - leases that had expired and been taken over before they could be renewed
+        released - leases given back after the check
+        expired - expired leases removed by the sweep
+    """
+    COUNTERS = ("acquired", "reclaimed", "contended", "renewed", "lost", "released", "expired")
+
+    def __init__(self):
+        self.counts = dict.fromkeys(self.COUNTERS, 0)
+        self.exported = {name: LEASE_EVENTS.labels(name) for name in self.COUNTERS}
+        self.lock = threading.Lock()
+
+    def incr(self, name:str, amount:int=1):
+        with self.lock:
+            self.counts[name] += amount
+        if amount:
+            self.exported[name].inc(amount)
+
+    def snapshot(self)->dict:
+        with self.lock:
+            return dict(self.counts)
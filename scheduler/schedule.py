@@ -0,0 +1,60 @@
+from typing import Optional
+from datetime import datetime
+import heapq
+import threading
+
+class DeadlineQueue:
+    """
+    In-memory schedule of monitored url deadlines (next_check_at), earliest first.
+    A url has at most one live deadline: pushing it again replaces the old one,
+    which stays in the heap and is skipped when it reaches the top.
+    Thread safe, worker threads push the next deadline of the url they checked.
+    """
+    def __init__(self):
+        self.heap = [] # (due_at, url_id)
+        self.deadlines = {} # url_id -> due_at
+        self.lock = threading.Lock()
+
+    def push(self, url_id:int, due_at:datetime):
+        with self.lock:
+            if self.deadlines.get(url_id) == due_at:
+                return
+            self.deadlines[url_id] = due_at
+            heapq.heappush(self.heap, (due_at, url_id))
+            # stale entries would otherwise pile up on a long running scheduler
+            if len(self.heap) > 2 * len(self.deadlines) + 1024:
+                self.heap = [(due, url_id) for url_id, due in self.deadlines.items()]
+                heapq.heapify(self.heap)
+
+    def discard(self, url_id:int):
+        with self.lock:
+            self.deadlines.pop(url_id, None)
+
+    def next_due(self)->Optional[datetime]:
+        with self.lock:
+            self._drop_stale()
+            return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now:datetime)->list[tuple[int, datetime]]:
+        """Remove and return the (url_id, due_at) of every deadline at or before now."""
+        due = []
+        with self.lock:
+            self._drop_stale()
+            while self.heap and self.heap[0][0] <= now:
+                due_at, url_id = heapq.heappop(self.heap)
+                del self.deadlines[url_id]
+                due.append((url_id, due_at))
+                self._drop_stale()
+        return due
+
+    def clear(self):
+        with self.lock:
+            self.heap = []
+            self.deadlines = {}
+
+    def __len__(self):
+        return len(self.deadlines)
+
+    def _drop_stale(self):
+        while self.heap and self.deadlines.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
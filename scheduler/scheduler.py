@@ -1,11 +1,22 @@
-from sqlalchemy import create_engine, select
+from sqlalchemy import create_engine, select, delete, update, values, column, literal, literal_column, Integer, String, DateTime
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session, sessionmaker
+from concurrent.futures import ThreadPoolExecutor, wait
+from prometheus_client import start_http_server
+import threading
 import time
 from datetime import datetime, timezone, timedelta
 
 from .config import config
-from app.services import check_health
-from app.models import MonitoredUrl, HealthCheck, SchedulerLock
+from .maintenance import run_maintenance
+from .schedule import DeadlineQueue
+from .metrics import LagTracker, LockMetrics, CLAIM_BATCH_SIZE, CLAIM_DURATION, RELEASE_DURATION
+from .leases import LeaseKeeper, sweep_expired_locks
+from .sharding import ShardMembership
+from .listener import ChangeListener
+from app.services import check_health, AsyncChecker, ResultSink, health_check_row, URL_CHANGES_CHANNEL
+from app.models import MonitoredUrl, SchedulerLock
+from app.utils import next_slot, next_check_time, backoff_with_jitter
 import logging
 logging.basicConfig(level=logging.INFO)
 
@@ -15,124 +26,447 @@ class Scheduler:
     def __init__(self):
         self.scheduler_id = config.INSTANCE_ID
         self.running = False
-        self.engine = create_engine(config.DATABASE_URL)
-        self.SessionLocal = sessionmaker(bind=self.engine)
+        self.last_maintenance = None
+        self.schedule = DeadlineQueue()
+        self.loaded_until = None # end of the part of the horizon loaded into the schedule
+        self.last_refill = None
+        self.last_reconcile = None
+        self.lag = LagTracker()
+        self.lock_metrics = LockMetrics()
+        self.last_lock_sweep = None
+        self.last_metrics_report = time.monotonic()
+        self.wakeup = threading.Event()
+        # one connection per worker, one for claiming due urls, one for the result sink,
+        # one for the background lease renewals and heartbeats and one to LISTEN on
+        self.engine = create_engine(config.DATABASE_URL, pool_size=config.WORKER_COUNT + 4)
+        # claimed urls are leased to this scheduler, so they need no reload after each commit
+        self.SessionLocal = sessionmaker(bind=self.engine, expire_on_commit=False)
+        self.sink = ResultSink(
+            self.SessionLocal,
+            max_batch=config.SINK_BATCH_SIZE,
+            flush_interval=config.SINK_FLUSH_INTERVAL,
+            max_buffer=config.SINK_MAX_BUFFER,
+        )
+        self.leases = LeaseKeeper(
+            self.scheduler_id,
+            self.SessionLocal,
+            lock_timeout=config.LOCK_TIMEOUT,
+            interval=config.LEASE_RENEW_INTERVAL,
+            metrics=self.lock_metrics,
+        )
+        self.leases.start()
+        self.executor = None
+        if config.PROBE_MODE == "threads":
+            self.executor = ThreadPoolExecutor(
+                max_workers=config.WORKER_COUNT,
+                thread_name_prefix=self.scheduler_id,
+            )
+        self.async_checker = None
+        if config.PROBE_MODE == "async":
+            self.async_checker = AsyncChecker(
+                max_concurrency=config.MAX_CONCURRENCY,
+                max_per_host=config.MAX_PER_HOST,
+            )
+        self.membership = None
+        if config.SHARDING_ENABLED:
+            self.membership = ShardMembership(
+                self.scheduler_id,
+                self.SessionLocal,
+                slots=config.SHARD_SLOTS,
+                interval=config.HEARTBEAT_INTERVAL,
+                member_ttl=config.MEMBER_TTL,
+                on_change=self.rebalance,
+            )
+            self.membership.start()
+        self.listener = None
+        if config.LISTEN_ENABLED:
+            self.listener = ChangeListener(
+                self.engine,
+                URL_CHANGES_CHANNEL,
+                on_notify=self.apply_change,
+                on_reconnect=self.rebalance,
+            )
+            self.listener.start()
 
-    def acquire_lock(self, session:Session, url:MonitoredUrl)->bool:
-    
+    def owns(self, url_id:int)->bool:
+        return self.membership is None or url_id % config.SHARD_SLOTS in self.membership.owned_slots
+
+    def apply_change(self, change:dict):
+        """
+        Patch the schedule with a monitored url change sent by the API, see
+        app.services.notify_url_changed, or reload it after a bulk change.
+        Runs on the listener thread.
+        """
+        if change.get("reload"):
+            self.rebalance()
+            return
+        url_id = change["id"]
+        if change["deleted"] or not change["is_active"] or not self.owns(url_id):
+            self.schedule.discard(url_id)
+        elif change["next_check_at"] is not None:
+            self.schedule.push(url_id, datetime.fromisoformat(change["next_check_at"]))
+        else:
+            # never scheduled: the reload gives it a slot
+            self.last_reconcile = None
+        self.wakeup.set()
+
+    def shard_filter(self):
+        """Restricts a monitored_urls query to the shard slots this scheduler owns, None when not sharding."""
+        if self.membership is None:
+            return None
+        return (MonitoredUrl.id % config.SHARD_SLOTS).in_(self.membership.owned_slots)
+
+    def rebalance(self):
+        """
+        Reload the schedule. Called from the heartbeat thread when the owned slots
+        changed, and from the listener after it reconnected and may have missed changes.
+        """
+        self.last_reconcile = None
+        self.wakeup.set()
+
+    def claim_due_urls(self, session:Session)->list[MonitoredUrl]:
+        """
+        Lease up to BATCH_SIZE due urls in a single statement.
+        Due rows are picked with FOR UPDATE SKIP LOCKED, so concurrent schedulers split
+        the due urls between them instead of racing for the same rows. A lease is a
+        scheduler_locks row; an expired lease left behind by a crashed scheduler is
+        taken over in the same statement. With sharding on, only the urls in the shard
+        slots this scheduler owns are considered.
+        """
+        start = time.perf_counter()
         now = datetime.now(timezone.utc)
-        expires_at = now + timedelta(seconds=config.LOCK_TIMEOUT)    
-        existing_lock = session.get(SchedulerLock, url.id)
-        if existing_lock:
-            if existing_lock.expires_at <= now:
-                existing_lock.locked_by = self.scheduler_id
-                existing_lock.locked_at = now
-                existing_lock.expires_at = expires_at
-                session.commit()
-                return True
-            else:
-                return False
+        expires_at = now + timedelta(seconds=config.LOCK_TIMEOUT)
+        leased = (
+            select(SchedulerLock.monitored_url_id)
+            .where(SchedulerLock.monitored_url_id == MonitoredUrl.id)
+            .where(SchedulerLock.expires_at > now)
+            .exists()
+        )
+        due = (
+            select(
+                MonitoredUrl.id,
+                literal(self.scheduler_id, String),
+                literal(now, DateTime(timezone=True)),
+                literal(expires_at, DateTime(timezone=True)),
+            )
+            .where(MonitoredUrl.is_active == True)
+            # urls without a next_check_at are given a slot by refill() first
+            .where(MonitoredUrl.next_check_at < now)
+            .where(~leased)
+            .order_by(MonitoredUrl.next_check_at.asc())
+            .limit(config.BATCH_SIZE)
+            .with_for_update(skip_locked=True, of=MonitoredUrl)
+        )
+        shard = self.shard_filter()
+        if shard is not None:
+            # leases stay, they cover the moment two schedulers disagree on who owns a slot
+            due = due.where(shard)
+        insert_stmt = pg_insert(SchedulerLock).from_select(
+            ["monitored_url_id", "locked_by", "locked_at", "expires_at"], due
+        )
+        claimed = (
+            insert_stmt.on_conflict_do_update(
+                index_elements=[SchedulerLock.monitored_url_id],
+                set_={
+                    "locked_by": insert_stmt.excluded.locked_by,
+                    "locked_at": insert_stmt.excluded.locked_at,
+                    "expires_at": insert_stmt.excluded.expires_at,
+                },
+                where=SchedulerLock.expires_at <= now,
+            )
+            # xmax is 0 on a freshly inserted row, and set on one the upsert updated,
+            # which is an expired lease taken over
+            .returning(SchedulerLock.monitored_url_id, literal_column("xmax = 0").label("inserted"))
+            .cte("claimed")
+        )
+        stmt = select(MonitoredUrl, claimed.c.inserted).join(claimed, claimed.c.monitored_url_id == MonitoredUrl.id)
+        rows = session.execute(stmt).all()
+        session.commit()
+        CLAIM_DURATION.observe(time.perf_counter() - start)
+        CLAIM_BATCH_SIZE.observe(len(rows))
+        urls = [url for url, _ in rows]
+        self.lock_metrics.incr("acquired", len(urls))
+        self.lock_metrics.incr("reclaimed", sum(1 for _, inserted in rows if not inserted))
+        self.leases.hold([url.id for url in urls])
+        return urls
 
+    def release_locks(self, session:Session, url_ids:list[int]):
+        if not url_ids:
+            return
+        # stop renewing first, so a renewal racing the delete is not counted as a lost lease
+        self.leases.release(url_ids)
+        start = time.perf_counter()
+        stmt = (
+            delete(SchedulerLock)
+            .where(SchedulerLock.monitored_url_id.in_(url_ids))
+            .where(SchedulerLock.locked_by == self.scheduler_id)
+        )
+        session.execute(stmt)
+        session.commit()
+        RELEASE_DURATION.observe(time.perf_counter() - start)
+        self.lock_metrics.incr("released", len(url_ids))
+
+    def sweep_locks(self):
+        now = time.monotonic()
+        if self.last_lock_sweep is not None and now - self.last_lock_sweep < config.LOCK_SWEEP_INTERVAL:
+            return
+        self.last_lock_sweep = now
+        try:
+            with self.SessionLocal() as session:
+                swept = sweep_expired_locks(session)
+            self.lock_metrics.incr("expired", swept)
+            if swept:
+                logger.info(f"Swept {swept} expired leases")
+        except Exception as e:
+            logger.error(f"Expired lease sweep failed: {str(e)}")
+
+    def record_result(self, url: MonitoredUrl, result:dict)->datetime:
+        """Queue the check and the url's next schedule on the result sink."""
+        now = datetime.now(timezone.utc)
+        if result.get("status") == "healthy":
+            # back on the url's own slot in the interval
+            next_check_at = next_check_time(url.url, url.check_interval_s, now)
+            consecutive_failures = 0
         else:
+            consecutive_failures = url.consecutive_failures + 1
+            backoff_seconds = min(
+               url.check_interval_s * (config.BACKOFF_MULTIPLIER ** consecutive_failures)
+            , config.MAX_BACKOFF)
+            # jitter spreads capped backoffs below MAX_BACKOFF, clamping after it keeps them from going over
+            backoff_seconds = min(
+                backoff_with_jitter(url.url, backoff_seconds, consecutive_failures, config.BACKOFF_JITTER),
+                config.MAX_BACKOFF,
+            )
+            next_check_at = now + timedelta(seconds=backoff_seconds)
+
+        self.sink.add(
+            health_check_row(url.url, url.timeout_s, result, now),
+            {
+                "id": url.id,
+                "next_check_at": next_check_at,
+                "last_checked_at": now,
+                "consecutive_failures": consecutive_failures,
+            },
+        )
+        self.schedule.push(url.id, next_check_at)
+        return next_check_at
+
+    def record_lag(self, url: MonitoredUrl):
+        if url.next_check_at is not None:
+            self.lag.record((datetime.now(timezone.utc) - url.next_check_at).total_seconds())
+
+    def check_single_url(self, url: MonitoredUrl):
+        logger.info(f"Processing {url.url}")
+        self.record_lag(url)
+        result = check_health(url.url, url.timeout_s)
+        self.record_result(url, result)
+
+    def check_url_in_worker(self, url_id:int):
+        """Runs on a worker thread, with a session of its own."""
+        with self.SessionLocal() as session:
+            url = session.get(MonitoredUrl, url_id)
+            if url is None:
+                return
+            try:
+                self.check_single_url(url)
+            except Exception as e:
+                logger.error(f"Failed while processing {url_id}: {str(e)}")
+
+    def check_batch(self, urls:list[MonitoredUrl]):
+        logger.info(f"Processing a batch of {len(urls)} urls")
+        for url in urls:
+            self.record_lag(url)
+        results = self.async_checker.check_batch([(url.url, url.timeout_s) for url in urls])
+        for url, result in zip(urls, results):
             try:
-                lock = SchedulerLock(
-                    monitored_url_id = url.id,
-                    locked_by = self.scheduler_id,
-                    locked_at = now,
-                    expires_at=expires_at,
-                )
-                session.add(lock)
-                session.commit()
-                return True
+                self.record_result(url, result)
             except Exception as e:
-                session.rollback()
-                return False
-        
-    def release_lock(self, session: Session, url: MonitoredUrl):
-        lock = session.get(SchedulerLock, url.id)
-        if lock and lock.locked_by == self.scheduler_id:
-            session.delete(lock)
-            session.commit()
-        
-    def get_due_urls(self, session:Session):
+                logger.error(f"Failed while recording {url.url}: {str(e)}")
+
+    def run_once(self)->int:
+        """Claim and check one batch of due urls, returns the number of urls claimed."""
+        with self.SessionLocal() as session:
+            urls = self.claim_due_urls(session)
+            url_ids = [url.id for url in urls]
+            try:
+                if self.executor is not None:
+                    # ORM objects are bound to the session that loaded them, so only ids cross threads
+                    wait([self.executor.submit(self.check_url_in_worker, url_id) for url_id in url_ids])
+                elif self.async_checker is not None:
+                    self.check_batch(urls)
+                else:
+                    for url in urls:
+                        try:
+                            self.check_single_url(url)
+                        except Exception as e:
+                            logger.error(f"Failed while processing {url.url}: {str(e)}")
+            finally:
+                # the new schedules must be committed before the leases go
+                if self.sink.flush():
+                    logger.info(f"Releasing {len(url_ids)} leases")
+                    self.release_locks(session, url_ids)
+                else:
+                    # keep the leases, unrenewed, so the urls are not claimed again before their
+                    # schedules are written: the sink retries them, the leases expire on their own
+                    logger.warning(f"Keeping {len(url_ids)} leases until they expire, the results are not written yet")
+                    self.leases.release(url_ids)
+        return len(url_ids)
+
+    def refill(self, full:bool=False):
+        """
+        Load the deadlines up to SCHEDULE_HORIZON seconds ahead into the schedule.
+        Only the part of the horizon past what was loaded before is read, plus the
+        urls that were never checked. full reloads the whole horizon, to pick up
+        urls rescheduled by other schedulers or through the API.
+        """
         now = datetime.now(timezone.utc)
+        until = now + timedelta(seconds=config.SCHEDULE_HORIZON)
+        if full or self.loaded_until is None:
+            window = (MonitoredUrl.next_check_at == None) | (MonitoredUrl.next_check_at < until)
+        else:
+            window = (MonitoredUrl.next_check_at == None) | (
+                (MonitoredUrl.next_check_at >= self.loaded_until) & (MonitoredUrl.next_check_at < until)
+            )
+        stmt = (
+            select(MonitoredUrl.id, MonitoredUrl.url, MonitoredUrl.check_interval_s, MonitoredUrl.next_check_at)
+            .where(MonitoredUrl.is_active == True)
+            .where(window)
+        )
+        shard = self.shard_filter()
+        if shard is not None:
+            stmt = stmt.where(shard)
+        with self.SessionLocal() as session:
+            rows = session.execute(stmt).all()
+            unscheduled = {
+                url_id: next_slot(url, check_interval_s, now)
+                for url_id, url, check_interval_s, next_check_at in rows
+                if next_check_at is None
+            }
+            self.assign_slots(session, unscheduled)
+        if full:
+            self.schedule.clear()
+        for url_id, _, _, next_check_at in rows:
+            self.schedule.push(url_id, next_check_at or unscheduled[url_id])
+        self.loaded_until = until
+        logger.info(f"Loaded {len(rows)} deadlines, {len(self.schedule)} scheduled")
+
+    def assign_slots(self, session:Session, slots:dict[int, datetime]):
+        """
+        Give urls that were never scheduled their first check time, so a batch of
+        new urls is spread over its interval instead of being checked all at once.
+        """
+        if not slots:
+            return
+        slot_values = values(
+            column("id", Integer),
+            column("next_check_at", DateTime(timezone=True)),
+            name="slots",
+        ).data(list(slots.items()))
         stmt = (
-                select(MonitoredUrl)
-                .where(MonitoredUrl.is_active == True)
-                .where(
-                    (MonitoredUrl.next_check_at == None) |
-                    (MonitoredUrl.next_check_at < now)
-                )
-                .limit(config.BATCH_SIZE)
+            update(MonitoredUrl)
+            .where(MonitoredUrl.id == slot_values.c.id)
+            .where(MonitoredUrl.next_check_at == None)
+            .values(next_check_at=slot_values.c.next_check_at)
+            .execution_options(synchronize_session=False)
+        )
+        session.execute(stmt)
+        session.commit()
+
+    def refresh_schedule(self):
+        now = time.monotonic()
+        if self.last_reconcile is None or now - self.last_reconcile >= config.RECONCILE_INTERVAL:
+            self.refill(full=True)
+            self.last_reconcile = self.last_refill = now
+        elif now - self.last_refill >= config.REFILL_INTERVAL:
+            self.refill()
+            self.last_refill = now
+
+    def report_metrics(self):
+        now = time.monotonic()
+        if now - self.last_metrics_report < config.METRICS_REPORT_INTERVAL:
+            return
+        self.last_metrics_report = now
+        lag = self.lag.snapshot()
+        if lag["count"]:
+            logger.info(
+                f"Scheduling lag over {lag['count']} checks: p50 {lag['p50_s']:.3f}s, "
+                f"p99 {lag['p99_s']:.3f}s, max {lag['max_s']:.3f}s"
             )
-        result = session.execute(stmt)
-        urls = result.scalars().all()
-        return urls
+        logger.info(f"Leases: {self.lock_metrics.snapshot()}")
 
-    def check_single_url(self, session:Session, url: MonitoredUrl):
-        logger.info(f"Processing {url.url}")
-        if not self.acquire_lock(session, url):
-            logger.info(f"Another scheduler holds a lock on {url.url}")
+    def maintain(self):
+        now = time.monotonic()
+        if self.last_maintenance is not None and now - self.last_maintenance < config.MAINTENANCE_INTERVAL:
             return
+        self.last_maintenance = now
         try:
-            result = check_health(url.url, url.timeout_s)
-            hc = HealthCheck(
-                url = url.url,
-                timeout_s = url.timeout_s,
-                status_code = result.get("status_code"),
-                is_healthy = True if result.get("status") == "healthy" else False,
-                response_time_ms = result.get("response_time_ms"),
-                error = result.get("error"),
-            )
-            session.add(hc)
-            now = datetime.now(timezone.utc)
-            url.last_checked_at = now
-
-            if result.get("status") == "healthy":
-                url.next_check_at = now + timedelta(seconds=url.check_interval_s)
-                url.consecutive_failures = 0
-            else:
-                url.consecutive_failures +=1
-                backoff_seconds = min(
-                   url.check_interval_s * (config.BACKOFF_MULTIPLIER ** url.consecutive_failures)
-                , config.MAX_BACKOFF)
-                url.next_check_at = now + timedelta(seconds=backoff_seconds)
-            session.commit()
-        finally:
-            logger.info(f"Releasing lock on {url.url}")
-            self.release_lock(session, url)
-    
-    def run_once(self):
-        with self.SessionLocal() as session:
-            urls = self.get_due_urls(session)
-            for url in urls:
-                try:
-                    self.check_single_url(session, url)
-                    session.commit()
-                except Exception as e:
-                    session.rollback()
-                    logger.error(f"Failed while processing {url.url}: {str(e)}")
-                
-        
+            run_maintenance(self.engine)
+        except Exception as e:
+            logger.error(f"Partition maintenance failed: {str(e)}")
+
     def run(self):
+        """
+        Sleep until the earliest deadline in the schedule, then claim and check
+        whatever is due. The database is only read when something is due and
+        every REFILL_INTERVAL seconds.
+        """
         self.running = True
         while self.running:
-            logger.info(f"{self.scheduler_id} is running")
-            self.run_once()
-            logger.info(f"{self.scheduler_id} taking a break")
-            time.sleep(config.LOOP_INTERVAL)
-        
+            self.maintain()
+            self.sweep_locks()
+            self.refresh_schedule()
+            self.report_metrics()
+            due = self.schedule.pop_due(datetime.now(timezone.utc))
+            if due:
+                # claim until the backlog of due urls is drained
+                claimed = self.run_once()
+                total = claimed
+                while self.running and claimed >= config.BATCH_SIZE:
+                    claimed = self.run_once()
+                    total += claimed
+                self.lock_metrics.incr("contended", max(len(due) - total, 0))
+                continue
+
+            timeout = config.REFILL_INTERVAL - (time.monotonic() - self.last_refill)
+            next_due = self.schedule.next_due()
+            if next_due is not None:
+                timeout = min(timeout, (next_due - datetime.now(timezone.utc)).total_seconds())
+            if timeout > 0:
+                self.wakeup.wait(timeout)
+                self.wakeup.clear()
+
+    def stop(self):
+        self.running = False
+        self.wakeup.set()
+
+    def close(self):
+        if self.membership is not None:
+            self.membership.leave()
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+        self.leases.stop()
+        if self.listener is not None:
+            self.listener.stop()
+        if self.async_checker is not None:
+            self.async_checker.close()
+        self.sink.close()
+        self.engine.dispose()
 
 
 def main():
+    if config.METRICS_PORT:
+        start_http_server(config.METRICS_PORT)
+        logger.info(f"Serving metrics on port {config.METRICS_PORT}")
     scheduler = Scheduler()
 
     try:
         logger.info(f"Starting scheduler {scheduler.scheduler_id}")
         scheduler.run()
     except KeyboardInterrupt as e:
-        scheduler.running = False
+        scheduler.stop()
         logger.info(f"Stopping scheduler {scheduler.scheduler_id}")
+    finally:
+        scheduler.close()
 
 
 if __name__ == '__main__':
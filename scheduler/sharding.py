@@ -0,0 +1,117 @@
+from typing import Callable, Optional
+from bisect import bisect_left
+from datetime import datetime, timezone, timedelta
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+import hashlib
+import threading
+import logging
+
+from app.models import SchedulerMember
+
+logger = logging.getLogger(__name__)
+
+def ring_hash(key:str)->int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+class HashRing:
+    """
+    Consistent hash ring over the scheduler instances. Every instance gets vnodes
+    points on the ring and a shard slot belongs to the first point at or after
+    the slot's hash, so an instance joining or leaving only moves the slots next
+    to its own points.
+    """
+    def __init__(self, members:list[str], vnodes:int=64):
+        self.members = sorted(members)
+        points = sorted((ring_hash(f"{member}#{i}"), member) for member in self.members for i in range(vnodes))
+        self.hashes = [h for h, _ in points]
+        self.owners = [member for _, member in points]
+
+    def owner(self, slot:int)->Optional[str]:
+        if not self.hashes:
+            return None
+        i = bisect_left(self.hashes, ring_hash(f"slot-{slot}"))
+        return self.owners[i % len(self.owners)]
+
+    def slots_of(self, member:str, slots:int)->list[int]:
+        return [slot for slot in range(slots) if self.owner(slot) == member]
+
+class ShardMembership:
+    """
+    Keeps this scheduler's heartbeat in scheduler_members and works out which shard
+    slots it owns. A url belongs to slot id % slots. Instances that have not sent a
+    heartbeat for member_ttl seconds are treated as gone and their slots move to the
+    others on the next heartbeat.
+    Args
+        instance_id - this scheduler's id
+        session_factory - callable returning a new Session
+        slots - number of shard slots
+        interval - seconds between heartbeats
+        member_ttl - seconds without a heartbeat before an instance is dropped
+        on_change - called after the owned slots changed
+    """
+    def __init__(self, instance_id:str, session_factory:Callable[[], Session], slots:int=1024,
+                 interval:float=5, member_ttl:float=15, on_change:Optional[Callable[[], None]]=None):
+        self.instance_id = instance_id
+        self.session_factory = session_factory
+        self.slots = slots
+        self.interval = interval
+        self.member_ttl = member_ttl
+        self.on_change = on_change
+        self.members = []
+        self.owned_slots = [] # replaced, never mutated, so readers need no lock
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.heartbeat()
+        self.thread = threading.Thread(target=self._run, name=f"{self.instance_id}-heartbeat", daemon=True)
+        self.thread.start()
+
+    def heartbeat(self)->bool:
+        """Refresh this instance's heartbeat and the live members, returns whether the owned slots changed."""
+        now = datetime.now(timezone.utc)
+        with self.session_factory() as session:
+            stmt = pg_insert(SchedulerMember).values(instance_id=self.instance_id, started_at=now, heartbeat_at=now)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[SchedulerMember.instance_id],
+                set_={"heartbeat_at": stmt.excluded.heartbeat_at},
+            )
+            session.execute(stmt)
+            # long gone instances are forgotten, recently dead ones are just skipped
+            session.execute(
+                delete(SchedulerMember)
+                .where(SchedulerMember.heartbeat_at < now - timedelta(seconds=self.member_ttl * 10))
+            )
+            members = session.execute(
+                select(SchedulerMember.instance_id)
+                .where(SchedulerMember.heartbeat_at >= now - timedelta(seconds=self.member_ttl))
+            ).scalars().all()
+            session.commit()
+
+        members = sorted(set(members) | {self.instance_id})
+        if members == self.members:
+            return False
+        owned_slots = HashRing(members).slots_of(self.instance_id, self.slots)
+        logger.info(f"Scheduler members {members}, {self.instance_id} owns {len(owned_slots)} of {self.slots} slots")
+        self.members = members
+        self.owned_slots = owned_slots
+        return True
+
+    def leave(self):
+        """Stop heartbeating and drop out, so the other instances take over the slots right away."""
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        with self.session_factory() as session:
+            session.execute(delete(SchedulerMember).where(SchedulerMember.instance_id == self.instance_id))
+            session.commit()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                if self.heartbeat() and self.on_change is not None:
+                    self.on_change()
+            except Exception as e:
+                logger.error(f"Scheduler heartbeat failed: {str(e)}")
@@ -0,0 +1,64 @@
+"""
+Load generator for the API: keeps a fixed number of keep-alive connections busy
+with GET requests and reports requests per second and latency percentiles.
+
+    python -m scripts.bench_api http://localhost:5000/health --concurrency 32 --duration 20
+"""
+import argparse
+import asyncio
+import time
+import aiohttp
+
+async def worker(session:aiohttp.ClientSession, url:str, deadline:float, latencies:list, errors:list):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            async with session.get(url) as response:
+                await response.read()
+                if response.status >= 400:
+                    errors.append(response.status)
+                    continue
+        except aiohttp.ClientError as e:
+            errors.append(type(e).__name__)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+async def run(url:str, concurrency:int, duration:float, warmup:float)->dict:
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        if warmup > 0:
+            await asyncio.gather(*(worker(session, url, time.perf_counter() + warmup, [], []) for _ in range(concurrency)))
+        latencies = []
+        errors = []
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(session, url, start + duration, latencies, errors) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    def quantile(q):
+        return latencies[min(int(q * len(latencies)), len(latencies) - 1)] * 1000 if latencies else None
+
+    return {
+        "url": url,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": quantile(0.5),
+        "p99_ms": quantile(0.99),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("url")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20, help="seconds")
+    parser.add_argument("--warmup", type=float, default=2, help="seconds")
+    args = parser.parse_args()
+    result = asyncio.run(run(args.url, args.concurrency, args.duration, args.warmup))
+    print(
+        f"{result['url']}: {result['rps']:.0f} req/s, p50 {result['p50_ms']:.1f}ms, "
+        f"p99 {result['p99_ms']:.1f}ms, {result['requests']} ok, {result['errors']} errors"
+    )
+
+if __name__ == '__main__':
+    main()
@@ -34,6 +34,27 @@ def test_get_health():
             "url": "https://www.google.com",
             "timeout": 50,
         },
+    },{
+        "name": "Force a new check - max_age 0",
+        "data": {
+            "url": "https://www.google.com",
+            "timeout": 20,
+            "max_age": 0,
+        },
+    },{
+        "name": "Invalid max_age",
+        "data": {
+            "url": "https://www.google.com",
+            "timeout": 20,
+            "max_age": -5,
+        },
+    },{
+        "name": "Invalid max_age - bool",
+        "data": {
+            "url": "https://www.google.com",
+            "timeout": 20,
+            "max_age": True,
+        },
     }]
 
     for url in test_urls:
@@ -43,5 +64,21 @@ def test_get_health():
             json=url["data"]
         )
         print(f"Result -> {json.dumps(result.json(), indent=2)}")
+
+    for max_age in ("nan", "inf"):
+        print(f"Testing for max_age-> {max_age}")
+        result = requests.post(
+            url=f"{BASE_URL}/check",
+            params={"max_age": max_age},
+            json={"url": "https://www.google.com", "timeout": 20},
+        )
+        assert result.status_code == 400
+
+    print("Testing for an unreachable url")
+    result = requests.post(url=f"{BASE_URL}/check", json={"url": "http://localhost:1/", "timeout": 5})
+    print(f"Result -> {json.dumps(result.json(), indent=2)}")
+    assert result.status_code == 200
+    assert result.json()["error"]
+
 if __name__ == '__main__':
     test_get_health()
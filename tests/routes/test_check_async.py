@@ -0,0 +1,53 @@
+import requests
+import json
+
+BASE_URL = "http://localhost:5000/api/v1"
+
+def test_start_check():
+    test_urls = [{
+        "name": "Valid URL - google.com",
+        "data": {
+            "url": "https://www.google.com",
+            "timeout": 20,
+        },
+        "status": 202,
+    },{
+        "name": "Invalid URL scheme - hyyf://",
+        "data": {
+            "url": "hyyf://www.google.com",
+            "timeout": 20,
+        },
+        "status": 400,
+    },{
+        "name": "Invalid timeout - beyond the permitted limit",
+        "data": {
+            "url": "https://www.google.com",
+            "timeout": 50,
+        },
+        "status": 400,
+    }]
+    for test_url in test_urls:
+        print(f"Testing {test_url['name']}")
+        result = requests.post(f"{BASE_URL}/check/async", json=test_url["data"])
+        print(f"Result -> {json.dumps(result.json(), indent=2)}")
+        assert result.status_code == test_url["status"]
+
+def test_get_check_job():
+    print("Testing long-poll of an async check")
+    job = requests.post(f"{BASE_URL}/check/async", json={"url": "https://www.google.com", "timeout": 20}).json()
+    result = requests.get(f"{BASE_URL}/check/jobs/{job['job_id']}", params={"wait": 25})
+    print(f"Result -> {json.dumps(result.json(), indent=2)}")
+    assert result.json()["status"] in ("done", "failed")
+
+    for wait in ("nan", "inf", "-1"):
+        print(f"Testing an invalid wait of {wait}")
+        result = requests.get(f"{BASE_URL}/check/jobs/{job['job_id']}", params={"wait": wait})
+        assert result.status_code == 400
+
+    print("Testing an unknown job")
+    result = requests.get(f"{BASE_URL}/check/jobs/999999999")
+    assert result.status_code == 404
+
+if __name__ == '__main__':
+    test_start_check()
+    test_get_check_job()
@@ -0,0 +1,35 @@
+import requests
+import json
+
+BASE_URL = "http://localhost:5000/api/v1"
+
+def test_check_batch():
+    print("Testing a batch check")
+    items = [
+        {"url": "https://www.google.com", "timeout": 20},
+        {"url": "https://www.github.com", "timeout": 20},
+        {"url": "hyyf://www.google.com", "timeout": 20},
+    ]
+    result = requests.post(f"{BASE_URL}/check/batch", json=items, params={"concurrency": 2}, stream=True)
+    lines = [json.loads(line) for line in result.iter_lines() if line]
+    for line in lines:
+        print(f"Result -> {json.dumps(line)}")
+    assert result.headers["Content-Type"].startswith("application/x-ndjson")
+    assert sorted(line["index"] for line in lines[:-1]) == [0, 1, 2]
+    assert lines[-1]["summary"]["count"] == 3
+
+    print("Testing a batch of failing checks, written as rows without a status code or response time")
+    items = [{"url": f"http://localhost:{port}/", "timeout": 5} for port in (1, 9)]
+    result = requests.post(f"{BASE_URL}/check/batch", json=items, stream=True)
+    lines = [json.loads(line) for line in result.iter_lines() if line]
+    print(f"Result -> {json.dumps(lines[-1])}")
+    assert all(line["error"] for line in lines[:-1])
+    assert lines[-1]["summary"]["error"] == 2
+    assert "error" not in lines[-1]
+
+    print("Testing a batch that is not a JSON array")
+    result = requests.post(f"{BASE_URL}/check/batch", json={"url": "https://www.google.com"})
+    assert result.status_code == 400
+
+if __name__ == '__main__':
+    test_check_batch()
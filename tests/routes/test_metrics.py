@@ -0,0 +1,17 @@
+import requests
+
+BASE_URL = "http://localhost:5000"
+
+def test_metrics():
+    print("Testing prometheus metrics endpoint")
+    requests.get(f"{BASE_URL}/health")
+    result = requests.get(f"{BASE_URL}/metrics")
+    print(f"Content type -> {result.headers['Content-Type']}")
+    for line in result.text.splitlines():
+        if line.startswith("thatworks_http_request_duration_seconds_count"):
+            print(line)
+    assert result.status_code == 200
+    assert 'thatworks_http_request_duration_seconds_count{blueprint="health"}' in result.text
+
+if __name__ == '__main__':
+    test_metrics()
@@ -0,0 +1,46 @@
+import requests
+import json
+
+BASE_URL = "http://localhost:5000/api/v1/monitored"
+
+def test_list_urls():
+    test_params = [{
+        "name": "First page",
+        "params": {
+            "limit": 10,
+        },
+    },{
+        "name": "Active urls whose latest check failed",
+        "params": {
+            "active": "true",
+            "failing": "true",
+        },
+    },{
+        "name": "Name prefix",
+        "params": {
+            "name_prefix": "google",
+        },
+    },{
+        "name": "Invalid active filter",
+        "params": {
+            "active": "yes",
+        },
+    },{
+        "name": "Invalid cursor",
+        "params": {
+            "cursor": "not-a-cursor",
+        },
+    },{
+        "name": "Invalid limit - negative",
+        "params": {
+            "limit": -1,
+        },
+    }]
+
+    for test in test_params:
+        print(f"Testing for -> {test['name']}")
+        result = requests.get(url=f"{BASE_URL}/urls", params=test["params"])
+        print(f"Result -> {json.dumps(result.json(), indent=2)}")
+
+if __name__ == '__main__':
+    test_list_urls()
@@ -0,0 +1,39 @@
+import requests
+import json
+
+BASE_URL = "http://localhost:5000/api/v1/monitored"
+
+def test_bulk_urls():
+    items = [{
+        "url": "https://www.google.com",
+        "name": "google",
+        "check_interval": 60,
+        "timeout": 10,
+    },{
+        "url": "https://www.github.com",
+        "check_interval": 300,
+        "timeout": 10,
+    },{
+        "url": "hyyf://www.google.com",
+        "check_interval": 60,
+        "timeout": 10,
+    }]
+
+    print("Testing bulk create - JSON array")
+    result = requests.post(url=f"{BASE_URL}/urls/bulk", json=items)
+    print(f"Result -> {json.dumps(result.json(), indent=2)}")
+
+    print("Testing bulk upsert - NDJSON")
+    result = requests.put(
+        url=f"{BASE_URL}/urls/bulk",
+        data="\n".join(json.dumps(dict(item, check_interval=120)) for item in items),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    print(f"Result -> {json.dumps(result.json(), indent=2)}")
+
+    print("Testing bulk delete")
+    result = requests.delete(url=f"{BASE_URL}/urls/bulk", json=[{"url": item["url"]} for item in items])
+    print(f"Result -> {json.dumps(result.json(), indent=2)}")
+
+if __name__ == '__main__':
+    test_bulk_urls()
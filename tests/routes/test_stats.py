@@ -0,0 +1,36 @@
+import requests
+import json
+
+BASE_URL = "http://localhost:5000/api/v1"
+
+def test_stats():
+    test_params = [{
+        "name": "Hourly stats for the last day",
+        "params": {
+            "url": "https://www.google.com",
+        },
+    },{
+        "name": "Daily stats for the last 30 days",
+        "params": {
+            "url": "https://www.google.com",
+            "hours": 720,
+            "granularity": "day",
+        },
+    },{
+        "name": "Missing URL",
+        "params": {},
+    },{
+        "name": "Invalid granularity",
+        "params": {
+            "url": "https://www.google.com",
+            "granularity": "week",
+        },
+    }]
+
+    for test in test_params:
+        print(f"Testing stats -> {test['name']}")
+        result = requests.get(f"{BASE_URL}/stats", params=test["params"])
+        print(f"Result -> {json.dumps(result.json(), indent=2)}")
+
+if __name__ == '__main__':
+    test_stats()
@@ -0,0 +1,24 @@
+from app.services import AsyncChecker
+import json
+
+def test_async_checker():
+    print("Starting async checker tests")
+    targets = [
+        ('https://www.google.com', 10),
+        ('https://www.github.com', 10),
+        ('http://example.com', 10),
+        ('https://wrong.host.badssl.com', 10),
+        ('https://this-domain-does-not-exist', 10),
+    ]
+    checker = AsyncChecker(max_concurrency=10, max_per_host=2)
+    try:
+        results = checker.check_batch(targets)
+    finally:
+        checker.close()
+    assert len(results) == len(targets)
+    for (url, _), result in zip(targets, results):
+        assert result['url'] == url
+        print(f"Result -> {json.dumps(result, indent=2)}")
+
+if __name__ == '__main__':
+    test_async_checker()
@@ -0,0 +1,49 @@
+from app.services.dns_cache import DnsCache
+import socket
+
+def test_dns_cache():
+    print("Starting DNS cache tests")
+    cache = DnsCache(max_size=2)
+    for host in ['localhost', 'localhost', 'www.google.com', 'www.github.com']:
+        try:
+            addresses = cache.resolve(host, 443)
+            print(f"{host} -> {[sockaddr[0] for *_, sockaddr in addresses]}")
+        except socket.gaierror as e:
+            print(f"{host} -> {e}")
+    stats = cache.stats()
+    print(f"Stats -> {stats}")
+    assert stats['hits'] == 1
+    assert stats['misses'] == 3
+    assert stats['size'] == 2
+    assert stats['evictions'] == 1
+
+    # a name that does not resolve is answered from the negative cache the second time
+    for _ in range(2):
+        try:
+            cache.resolve('this-domain-does-not-exist.invalid', 443)
+        except socket.gaierror as e:
+            print(f"this-domain-does-not-exist.invalid -> {e}")
+    assert cache.stats()['hits'] == 2
+
+    # the non-blocking lookup answers from the cache only and leaves a miss for resolve to count
+    cache = DnsCache()
+    assert cache.resolve_cached('localhost', 443) is None
+    cache.resolve('localhost', 443)
+    addresses = cache.resolve_cached('localhost', 443)
+    print(f"cached localhost -> {addresses}")
+    assert addresses
+    assert cache.stats()['misses'] == 1
+    assert cache.stats()['hits'] == 1
+
+    # a name without an address of the requested family does not resolve
+    families = {address[0] for address in addresses}
+    if len(families) == 1:
+        try:
+            cache.resolve('localhost', 443, socket.AF_INET6 if socket.AF_INET in families else socket.AF_INET)
+            raise AssertionError("expected socket.gaierror")
+        except socket.gaierror as e:
+            print(f"localhost, other family -> {e}")
+            assert e.errno == socket.EAI_NONAME
+
+if __name__ == '__main__':
+    test_dns_cache()
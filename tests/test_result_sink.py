@@ -0,0 +1,48 @@
+from app.services import result_sink
+from app.services.result_sink import ResultSink
+
+class FakeSession:
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+def test_result_sink_retries_failed_writes(monkeypatch):
+    print("Starting result sink retry tests")
+    written = []
+    failures = [True]
+
+    def write_results(session, rows, schedule_updates=None):
+        if failures.pop(0) if failures else False:
+            raise RuntimeError("database is down")
+        written.append((rows, schedule_updates))
+
+    monkeypatch.setattr(result_sink, "write_results", write_results)
+    sink = ResultSink(FakeSession, max_batch=100, flush_interval=60, max_buffer=3)
+    sink.add({"url": "a"}, {"id": 1, "next_check_at": "old"})
+    sink.add({"url": "b"})
+    assert sink.flush() is False
+    # the failed batch waits in front of what was added since
+    sink.add({"url": "a"}, {"id": 1, "next_check_at": "new"})
+    assert sink.flush() is True
+    print(f"Written -> {written}")
+    assert written == [([{"url": "a"}, {"url": "b"}, {"url": "a"}], [{"id": 1, "next_check_at": "new"}])]
+
+    # results added while a write fails wait behind the failed batch, beyond
+    # max_buffer the oldest are dropped and counted
+    def failing_write(session, rows, schedule_updates=None):
+        for url in ("e", "f"):
+            sink.add({"url": url})
+        raise RuntimeError("database is down")
+
+    monkeypatch.setattr(result_sink, "write_results", failing_write)
+    for url in ("c", "d"):
+        sink.add({"url": url})
+    assert sink.flush() is False
+    print(f"Buffered -> {sink.rows}")
+    assert sink.rows == [{"url": "d"}, {"url": "e"}, {"url": "f"}]
+    assert sink.dropped == 1
+    monkeypatch.setattr(result_sink, "write_results", write_results)
+    sink.close()
+    assert sink.rows == []
@@ -0,0 +1,26 @@
+from scheduler.schedule import DeadlineQueue
+from datetime import datetime, timezone, timedelta
+
+def test_deadline_queue():
+    print("Starting deadline queue tests")
+    now = datetime.now(timezone.utc)
+    schedule = DeadlineQueue()
+    schedule.push(1, now + timedelta(seconds=30))
+    schedule.push(2, now - timedelta(seconds=5))
+    schedule.push(3, now + timedelta(seconds=10))
+    # a url pushed again keeps only its latest deadline
+    schedule.push(1, now - timedelta(seconds=1))
+    assert len(schedule) == 3
+    assert schedule.next_due() == now - timedelta(seconds=5)
+
+    due = schedule.pop_due(now)
+    print(f"Due -> {due}")
+    assert [url_id for url_id, _ in due] == [2, 1]
+    assert schedule.next_due() == now + timedelta(seconds=10)
+
+    schedule.discard(3)
+    assert schedule.next_due() is None
+    assert len(schedule) == 0
+
+if __name__ == '__main__':
+    test_deadline_queue()
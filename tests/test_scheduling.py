@@ -0,0 +1,32 @@
+from app.utils import next_slot, next_check_time, backoff_with_jitter
+from datetime import datetime, timezone, timedelta
+
+def test_next_slot():
+    print("Starting slot tests")
+    now = datetime.now(timezone.utc)
+    urls = [f"https://example.com/{i}" for i in range(1000)]
+    slots = [next_slot(url, 60, now) for url in urls]
+    # first checks are spread over the whole interval
+    seconds = [(slot - now).total_seconds() for slot in slots]
+    assert all(0 < s <= 60 for s in seconds)
+    per_ten_seconds = [sum(1 for s in seconds if i * 10 < s <= (i + 1) * 10) for i in range(6)]
+    print(f"First checks per 10s -> {per_ten_seconds}")
+    assert min(per_ten_seconds) > 100
+
+    # the slot is stable: the next one is exactly one interval later
+    slot = slots[0]
+    assert next_slot(urls[0], 60, slot) == slot + timedelta(seconds=60)
+    # and a check that ran a little late goes back on it
+    assert next_check_time(urls[0], 60, slot + timedelta(seconds=2)) == slot + timedelta(seconds=60)
+
+def test_backoff_with_jitter():
+    print("Starting backoff jitter tests")
+    backoffs = [backoff_with_jitter(f"https://example.com/{i}", 120, 1, 0.2) for i in range(100)]
+    assert all(96 <= b <= 144 for b in backoffs)
+    assert len(set(backoffs)) > 90
+    # the same url and failure count always get the same backoff
+    assert backoff_with_jitter("https://example.com/0", 120, 1, 0.2) == backoffs[0]
+
+if __name__ == '__main__':
+    test_next_slot()
+    test_backoff_with_jitter()
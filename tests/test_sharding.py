@@ -0,0 +1,20 @@
+from scheduler.sharding import HashRing
+
+def test_hash_ring():
+    print("Starting hash ring tests")
+    slots = 1024
+    ring = HashRing(["scheduler-1", "scheduler-2", "scheduler-3"])
+    owned = {member: ring.slots_of(member, slots) for member in ring.members}
+    print(f"Slots per member -> {({m: len(s) for m, s in owned.items()})}")
+    # every slot has exactly one owner, and the split is roughly even
+    assert sorted(slot for member_slots in owned.values() for slot in member_slots) == list(range(slots))
+    assert all(len(member_slots) > slots / 3 * 0.6 for member_slots in owned.values())
+
+    # a member joining only takes slots over, the others keep the rest of theirs
+    bigger = HashRing(["scheduler-1", "scheduler-2", "scheduler-3", "scheduler-4"])
+    moved = [slot for slot in range(slots) if bigger.owner(slot) != ring.owner(slot)]
+    print(f"Slots moved when scheduler-4 joined -> {len(moved)}")
+    assert all(bigger.owner(slot) == "scheduler-4" for slot in moved)
+
+if __name__ == '__main__':
+    test_hash_ring()
@@ -0,0 +1,41 @@
+from app.services.throttle import HostRateLimiter, SingleFlight
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+def test_host_rate_limiter():
+    print("Starting host rate limiter tests")
+    limiter = HostRateLimiter(rate=10, burst=2)
+    delays = [limiter.reserve('example.com') for _ in range(4)]
+    print(f"Delays -> {delays}")
+    # the burst goes through, then one probe every 1/rate seconds
+    assert delays[:2] == [0.0, 0.0]
+    assert 0.09 < delays[2] < 0.11
+    assert 0.19 < delays[3] < 0.21
+    # other hosts have their own bucket
+    assert limiter.reserve('example.org') == 0.0
+
+def test_single_flight():
+    print("Starting single flight tests")
+    flights = SingleFlight(window=0.5)
+    calls = []
+    started = threading.Event()
+
+    def probe():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return {'status': 'healthy'}
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(flights.do, 'https://example.com', probe) for _ in range(4)]
+        results = [future.result() for future in futures]
+    print(f"Results -> {results}")
+    assert len(calls) == 1
+    assert sum(shared for _, shared in results) == 3
+    # a call shortly after the probe finished still gets its result
+    assert flights.do('https://example.com', probe) == ({'status': 'healthy'}, True)
+
+if __name__ == '__main__':
+    test_host_rate_limiter()
+    test_single_flight()